@@ -0,0 +1,114 @@
+# benchmarks/generators.py
+"""Syntetiske data der ligner de rigtige rapporter (samme kolonner og typer)."""
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from ikea_nl_pipeline import REQUIRED_COLUMNS, load_keywords
+
+CUSTOMERS = (
+    [f"Kunde {i:03d}" for i in range(300)]
+    + ["IKEA Norway", "IKEA BE", "IKEA NL", "Brød Cooperativet"]
+)
+
+QUICKNOTES = [
+    "Solutions - Delay - Extra time spent (S)",
+    "Solutions - Customer deviation",
+    "Driver - Late pickup",
+    "Customer - Not at home",
+    "Solutions - Other",
+    "",
+]
+
+BOILERPLATE = [
+    "Chauffør ringede til kunden",
+    "Driver called support",
+    "Kunden var ikke hjemme",
+    "Levering gennemført uden problemer",
+    "Ruten blev omplanlagt",
+]
+
+def duration_controlling(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    est = rng.integers(60, 420, rows)
+    price = rng.integers(500, 5000, rows).astype(float)
+    # 1–3 QuickNotes pr. rute, semikolonsepareret
+    notes = np.array(QUICKNOTES, dtype=object)
+    quick = [
+        "; ".join(notes[rng.integers(0, len(notes), k)])
+        for k in rng.integers(1, 4, rows)
+    ]
+    return pd.DataFrame({
+        "SessionId": np.arange(1_000_000, 1_000_000 + rows),
+        "Date": pd.Timestamp("2025-03-03") + pd.to_timedelta(rng.integers(0, 7, rows), unit="D"),
+        "CustomerName": rng.choice(CUSTOMERS, rows),
+        "EstDuration": est,
+        "ActDuration": est + rng.integers(-30, 180, rows),
+        "Price": price,
+        "ActPrice": price + rng.integers(-200, 1500, rows),
+        "QuickNotes": quick,
+        "DriverName": rng.choice([f"Driver {i}" for i in range(500)], rows),
+        "VehicleType": rng.choice(["Van", "Truck", "Bike"], rows),
+    })
+
+def revenue(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Revenue-rapport med årskolonner 2016–2024 og 'YTD 2025'."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Name": [f"Kunde {i}" for i in range(rows)],
+        "ID": np.arange(rows),
+        "Category": rng.choice(["Retail", "Food", "B2B"], rows),
+        "Sales": rng.choice(["Anna", "Bo", "Carl"], rows),
+        "SDM": rng.choice(["Dina", "Emil"], rows),
+        "Product": rng.choice(["Same day", "Next day", "Pallets"], rows),
+    })
+    first_year = rng.integers(2016, 2027, rows)   # 2026 = aldrig omsætning
+    for year in range(2016, 2026):
+        col = "YTD 2025" if year == 2025 else str(year)
+        active = first_year <= year
+        df[col] = np.where(active, rng.integers(0, 500_000, rows), 0)
+    return df
+
+def ikea_nl_deviations(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    keywords = np.array(load_keywords()[0] or ["road closed"], dtype=object)
+    boiler = np.array(BOILERPLATE, dtype=object)
+    has_kw = rng.random(rows) < 0.4
+    notes = np.where(
+        has_kw,
+        boiler[rng.integers(0, len(boiler), rows)] + ", " + keywords[rng.integers(0, len(keywords), rows)],
+        boiler[rng.integers(0, len(boiler), rows)],
+    )
+    notes = np.where(rng.random(rows) < 0.1, None, notes)
+    df = pd.DataFrame({c: rng.integers(0, 1000, rows).astype(str) for c in REQUIRED_COLUMNS})
+    df["Date"] = pd.Timestamp("2025-03-03") + pd.to_timedelta(rng.integers(0, 30, rows), unit="D")
+    for col in ("ActualDuration (min)", "REVISEDActualDuration (min)", "EstimateDuration (min)", "Deviation (min)"):
+        df[col] = rng.integers(0, 600, rows)
+    df["SupportNote"] = notes
+    return df
+
+# --- Serialisering til upload-formater --------------------------------------
+
+def to_upload_bytes(df: pd.DataFrame, fmt: str, header_rows: int = 0) -> bytes:
+    """
+    Skriver en DataFrame som den ville komme fra datavarehuset. `header_rows`
+    indsætter titelrækker over overskriften (Revenue har header i række 5).
+    """
+    buf = io.BytesIO()
+    if fmt == "xlsx":
+        df.to_excel(buf, index=False, startrow=header_rows, engine="xlsxwriter")
+    elif fmt in ("csv", "csv.gz"):
+        prefix = "Rapport\n" * header_rows
+        data = (prefix + df.to_csv(index=False)).encode("utf-8")
+        if fmt == "csv.gz":
+            import gzip
+            data = gzip.compress(data, compresslevel=6)
+        return data
+    elif fmt == "parquet":
+        # Parquet har ingen titelrækker – skemaet bærer kolonnenavnene
+        df.to_parquet(buf, index=False)
+    else:
+        raise ValueError(f"Ukendt format: {fmt}")
+    return buf.getvalue()
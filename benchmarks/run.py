@@ -0,0 +1,201 @@
+# benchmarks/run.py
+"""
+Benchmark af hver analyse-fane på syntetiske data, trin for trin.
+
+    python -m benchmarks.run                          # 1k, 10k og 100k rækker
+    python -m benchmarks.run --sizes 1000,1000000,5000000 --max-xlsx-rows 200000
+    python -m benchmarks.run --compare benchmarks/results/a.json benchmarks/results/b.json
+
+Resultaterne gemmes som JSON i benchmarks/results/, så to kørsler kan
+sammenlignes (fx før og efter en opgradering af pandas).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks import generators
+from controlling_pipeline import CONTROLLING_SCHEMA, RULES, analyze_quicknotes, run_controlling_pipeline
+from export import to_bytes
+from ikea_nl_pipeline import IKEA_NL_SCHEMA, analyse_supportnote, analyse_supportnotes, keyword_matcher
+from ingest import parse_table
+from revenue_pipeline import REVENUE_SCHEMA, find_new_customers
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+INGEST_FORMATS = ["xlsx", "csv", "csv.gz", "parquet"]
+EXPORT_FORMATS = ["xlsx", "csv", "parquet"]
+# Den gamle række-for-række keyword-analyse er for langsom til store filer
+MAX_SCALAR_ROWS = 100_000
+
+# --- Måling -----------------------------------------------------------------
+
+def timed(fn, repeat: int, setup=None):
+    """
+    Kører `fn` `repeat` gange og returnerer (bedste tid i sek., sidste
+    resultat). `setup` kaldes uden for tidtagningen før hver gentagelse.
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+class Recorder:
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.records = []
+
+    def run(self, pipeline: str, stage: str, rows: int, fn, setup=None):
+        seconds, result = timed(fn, self.repeat, setup)
+        self.records.append({"pipeline": pipeline, "stage": stage, "rows": rows, "seconds": seconds})
+        print(f"  {pipeline:<12} {stage:<32} {rows:>10,} rækker  {seconds * 1000:>10.1f} ms")
+        return result
+
+def _ingest_and_export(rec: Recorder, pipeline: str, df: pd.DataFrame, schema, args,
+                       header_rows: int = 0) -> pd.DataFrame:
+    rows = len(df)
+    parsed = None
+    for fmt in INGEST_FORMATS:
+        if fmt == "xlsx" and rows > args.max_xlsx_rows:
+            continue
+        data = generators.to_upload_bytes(df, fmt, header_rows=header_rows)
+        parsed = rec.run(pipeline, f"ingest:{fmt}", rows, lambda: parse_table(data, _fmt(fmt), schema))
+    return parsed
+
+def _fmt(fmt: str) -> str:
+    return "excel" if fmt == "xlsx" else fmt
+
+def _export(rec: Recorder, pipeline: str, df: pd.DataFrame, args) -> None:
+    for fmt in EXPORT_FORMATS:
+        if fmt == "xlsx" and len(df) > args.max_xlsx_rows:
+            continue
+        rec.run(pipeline, f"export:{fmt}", len(df), lambda: to_bytes(df, fmt))
+
+def cold_matchers() -> None:
+    """Tømmer matchernes hukommelse, så hver gentagelse måler en kold scanning."""
+    RULES.quicknotes_matcher.clear_memo()
+    keyword_matcher().clear_memo()
+
+# --- Faner ------------------------------------------------------------------
+
+def bench_controlling(rec: Recorder, rows: int, args) -> None:
+    raw = generators.duration_controlling(rows, seed=args.seed)
+    df = _ingest_and_export(rec, "controlling", raw, CONTROLLING_SCHEMA, args)
+    df_q, _ = rec.run("controlling", "filter_pipeline", rows, lambda: run_controlling_pipeline(df),
+                      setup=cold_matchers)
+    rec.run("controlling", "analyze_quicknotes", rows, lambda: analyze_quicknotes(df),
+            setup=cold_matchers)
+    _export(rec, "controlling", df_q, args)
+
+def bench_revenue(rec: Recorder, rows: int, args) -> None:
+    raw = generators.revenue(rows, seed=args.seed)
+    df = _ingest_and_export(rec, "revenue", raw, REVENUE_SCHEMA, args, header_rows=4)
+    df_new, _ = rec.run("revenue", "new_customer_masks", rows, lambda: find_new_customers(df))
+    _export(rec, "revenue", df_new, args)
+
+def bench_ikea_nl(rec: Recorder, rows: int, args) -> None:
+    raw = generators.ikea_nl_deviations(rows, seed=args.seed)
+    df = _ingest_and_export(rec, "ikea_nl", raw, IKEA_NL_SCHEMA, args)
+    notes = df["SupportNote"]
+    result = rec.run("ikea_nl", "analyse_supportnotes", rows, lambda: analyse_supportnotes(notes),
+                     setup=cold_matchers)
+    if rows <= MAX_SCALAR_ROWS:
+        rec.run("ikea_nl", "analyse_supportnote (pr. række)", rows,
+                lambda: notes.map(analyse_supportnote), setup=cold_matchers)
+    _export(rec, "ikea_nl", df.join(result), args)
+
+BENCHMARKS = {
+    "controlling": bench_controlling,
+    "revenue": bench_revenue,
+    "ikea_nl": bench_ikea_nl,
+}
+
+# --- Sammenligning ----------------------------------------------------------
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Udskriver tid pr. trin for to kørsler; returnerer 1 hvis noget er blevet langsommere."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    key = lambda r: (r["pipeline"], r["stage"], r["rows"])
+    old_by_key = {key(r): r["seconds"] for r in old["records"]}
+    regressions = 0
+    print(f"{'fane':<12} {'trin':<32} {'rækker':>10}  {'før ms':>10} {'efter ms':>10}  faktor")
+    for r in new["records"]:
+        before = old_by_key.get(key(r))
+        if before is None:
+            continue
+        ratio = r["seconds"] / before if before else float("inf")
+        flag = "  <-- langsommere" if ratio > threshold else ""
+        regressions += bool(flag)
+        print(
+            f"{r['pipeline']:<12} {r['stage']:<32} {r['rows']:>10,}  "
+            f"{before * 1000:>10.1f} {r['seconds'] * 1000:>10.1f}  {ratio:5.2f}x{flag}"
+        )
+    return 1 if regressions else 0
+
+# --- Kørsel -----------------------------------------------------------------
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark af analyse-fanerne på syntetiske data")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="Kommaseparerede antal rækker (standard: 1000,10000,100000)")
+    parser.add_argument("--only", choices=list(BENCHMARKS), action="append",
+                        help="Kør kun denne fane (kan gentages)")
+    parser.add_argument("--repeat", type=int, default=3, help="Gentagelser pr. trin; bedste tid gemmes")
+    parser.add_argument("--max-xlsx-rows", type=int, default=100_000,
+                        help="Spring xlsx-ingest og -eksport over for større filer")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Sti til resultatfil (standard: benchmarks/results/<tid>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("FØR", "EFTER"),
+                        help="Sammenlign to resultatfiler i stedet for at køre")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Faktor der markeres som regression ved --compare (standard: 1.2)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, threshold=args.threshold)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    rec = Recorder(args.repeat)
+    for name in args.only or list(BENCHMARKS):
+        for rows in sizes:
+            BENCHMARKS[name](rec, rows, args)
+
+    run = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "records": rec.records,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(run, f, ensure_ascii=False, indent=2)
+    print(f"Resultater gemt i {out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# cli.py
+"""
+Kør analyserne uden Streamlit, fx som natligt job:
+
+    python cli.py controlling rapporter/ --out resultater/ --store
+    python cli.py ikea-nl deviations.xlsx --format csv
+    python cli.py revenue revenue.xlsx
+"""
+
+import argparse
+import os
+import sys
+
+from controlling_pipeline import analyze_controlling_files, pick_week_results, store_week_result
+from export import EXPORT_FORMATS, to_bytes
+from ikea_nl_pipeline import IKEA_NL_SCHEMA, OUTPUT_COLUMNS, load_keywords, run_ikea_nl_pipeline
+from ingest import FILE_SUFFIXES, list_input_files, parse_table, upload_bytes, upload_format
+from revenue_pipeline import REVENUE_SCHEMA, find_new_customers
+
+# --- Hjælpefunktioner -------------------------------------------------------
+
+def expand_inputs(paths: list[str]) -> list[str]:
+    """Filer gives videre som de er; mapper udvides til de understøttede filer i dem."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += list_input_files(path)
+        elif path.lower().endswith(FILE_SUFFIXES):
+            files.append(path)
+        else:
+            print(f"Springer over (ukendt filtype): {path}", file=sys.stderr)
+    return files
+
+def _stem(path: str) -> str:
+    name = os.path.basename(path)
+    for suffix in sorted(FILE_SUFFIXES, key=len, reverse=True):
+        if name.lower().endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+def write_result(df, out_dir: str, name: str, fmt: str, sheet_name: str = "Sheet1") -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.{fmt}")
+    with open(path, "wb") as f:
+        f.write(to_bytes(df, fmt, sheet_name))
+    return path
+
+# --- Kommandoer -------------------------------------------------------------
+
+def run_controlling(args) -> int:
+    jobs = [(path, path) for path in expand_inputs(args.inputs)]
+    if not jobs:
+        print("Ingen DurationControlling-filer fundet i: " + ", ".join(args.inputs), file=sys.stderr)
+        return 1
+    failed = 0
+    analysed = []
+    for res in analyze_controlling_files(jobs, args.workers):
+        if "error" in res:
+            print(f"FEJL {res['name']}: {res['error']}", file=sys.stderr)
+            failed += 1
+            continue
+        path = write_result(
+            res["result"], args.out, f"{_stem(res['name'])}_quicknotes", args.format
+        )
+        analysed.append(res)
+        print(f"{res['name']}: uge {res['week']}, {len(res['result'])} ruter -> {path}")
+    if args.store:
+        results, duplicates = pick_week_results(analysed)
+        for week in sorted(results):
+            store_week_result(week, results[week]["result"], results[week]["fingerprints"])
+        for name, warning in duplicates:
+            print(f"ADVARSEL {name}: {warning}", file=sys.stderr)
+    return 1 if failed else 0
+
+def run_ikea_nl(args) -> int:
+    _, keywords_error = load_keywords()
+    if keywords_error:
+        print(keywords_error, file=sys.stderr)
+        return 1
+    failed = 0
+    for path in expand_inputs(args.inputs):
+        try:
+            df = parse_table(upload_bytes(path), upload_format(path), IKEA_NL_SCHEMA)
+            df = run_ikea_nl_pipeline(df)
+        except Exception as e:
+            print(f"FEJL {path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        out = write_result(
+            df[OUTPUT_COLUMNS] if not df.empty else df,
+            args.out, f"{_stem(path)}_deviations", args.format, sheet_name="IKEA_NL_Deviations",
+        )
+        print(f"{path}: {len(df)} rækker med SupportNote -> {out}")
+    return 1 if failed else 0
+
+def run_revenue(args) -> int:
+    failed = 0
+    for path in expand_inputs(args.inputs):
+        try:
+            df = parse_table(upload_bytes(path), upload_format(path), REVENUE_SCHEMA)
+            df_new, _ = find_new_customers(df, args.cohort)
+        except Exception as e:
+            print(f"FEJL {path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        out = write_result(df_new, args.out, f"{_stem(path)}_new_customers", args.format)
+        print(f"{path}: {len(df_new)} nye kunder -> {out}")
+    return 1 if failed else 0
+
+# --- Argumenter -------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="CS Automation – analyser uden Streamlit")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(p):
+        p.add_argument("inputs", nargs="+", help="Filer eller mapper (xlsx, csv, csv.gz, parquet)")
+        p.add_argument("--out", default="output", help="Mappe til resultater (standard: output)")
+        p.add_argument("--format", choices=list(EXPORT_FORMATS), default="xlsx")
+
+    p = sub.add_parser("controlling", help="QuickNotes-analyse af DurationControlling-rapporter")
+    add_common(p)
+    p.add_argument("--store", action="store_true", help="Skriv hver uge til historikken (Overblik)")
+    p.add_argument("--workers", type=int, default=None, help="Antal processer (standard: antal CPU'er)")
+    p.set_defaults(func=run_controlling)
+
+    p = sub.add_parser("ikea-nl", help="Keyword-analyse af IKEA NL Deviations")
+    add_common(p)
+    p.set_defaults(func=run_ikea_nl)
+
+    p = sub.add_parser("revenue", help="Nye kunder fra Revenue-rapporten")
+    add_common(p)
+    p.add_argument("--cohort", type=int, default=None,
+                   help="Kohorteår (standard: seneste år i rapporten)")
+    p.set_defaults(func=run_revenue)
+    return parser
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
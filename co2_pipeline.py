@@ -0,0 +1,188 @@
+# co2_pipeline.py
+
+import functools
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from ingest import CHUNK_ROWS, TableSchema, content_hash, iter_table_chunks, upload_bytes
+from solar_pipeline import DATE, ROUTE_ID
+
+FACTORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "emission_factors.json")
+
+# Ekstra RouteStat-kolonner til CO2-beregningen
+VEHICLE_TYPE = "VehicleType"
+DISTANCE = "Distance (km)"
+
+REQUIRED_COLUMNS = [ROUTE_ID, DATE, VEHICLE_TYPE, DISTANCE]
+
+CO2_SCHEMA = TableSchema(
+    columns=tuple(REQUIRED_COLUMNS),
+    numeric=(DISTANCE,),
+    categorical=(VEHICLE_TYPE,),
+    dates=(DATE,),
+    required=tuple(REQUIRED_COLUMNS),
+)
+
+# Antal færdige CO2-resultater der holdes i hukommelsen på tværs af sessioner
+MAX_CACHED_RESULTS = 8
+
+# --- Emissionsfaktorer ------------------------------------------------------
+
+class EmissionFactors:
+    """
+    Kompileret udgave af emission_factors.json: kg CO2e pr. km pr.
+    køretøjstype. Typer, der ikke står i filen, får standardfaktoren.
+    """
+
+    def __init__(self, factors: dict):
+        self.fingerprint = hashlib.blake2b(
+            json.dumps(factors, sort_keys=True, ensure_ascii=False).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+        self.unit = factors.get("unit", "kg CO2e pr. km")
+        self.default = float(factors.get("default", 0))
+        self.by_type = {
+            name.strip().lower(): float(value)
+            for name, value in factors.get("vehicle_types", {}).items()
+        }
+
+    def table(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"Køretøjstype": list(self.by_type), self.unit: list(self.by_type.values())}
+        )
+
+    def lookup(self, vehicle_types: pd.Series) -> tuple[pd.Series, pd.Series]:
+        """
+        Faktor pr. række og en maske for ukendte typer. Kategoriske kolonner
+        slås op én gang pr. kategori og udvides via kategorikoderne.
+        """
+        if not isinstance(vehicle_types.dtype, pd.CategoricalDtype):
+            vehicle_types = vehicle_types.astype("category")
+        keys = vehicle_types.cat.categories.astype(str).str.strip().str.lower()
+        by_category = pd.Series(keys).map(self.by_type).to_numpy(dtype="float64")
+        # Kode -1 (manglende type) peger på det sidste element, NaN
+        by_category = np.append(by_category, np.nan)
+        factors = by_category[vehicle_types.cat.codes.to_numpy()]
+        unknown = np.isnan(factors)
+        factors[unknown] = self.default
+        index = vehicle_types.index
+        return pd.Series(factors, index=index), pd.Series(unknown, index=index)
+
+@functools.lru_cache(maxsize=None)
+def load_emission_factors(path: str = FACTORS_PATH) -> EmissionFactors:
+    """Læser og kompilerer faktorfilen én gang pr. proces."""
+    with open(path, "r", encoding="utf-8") as f:
+        return EmissionFactors(json.load(f))
+
+# --- Beregning --------------------------------------------------------------
+
+def _route_emissions(chunk: pd.DataFrame, factors: EmissionFactors) -> pd.DataFrame:
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError("Manglende kolonner i RouteStat-filen: " + ", ".join(missing))
+
+    factor, unknown = factors.lookup(chunk[VEHICLE_TYPE])
+    km = chunk[DISTANCE].fillna(0)
+    # ISO-uge beregnes pr. unik dag (en uges fil har kun få) og udvides via koderne
+    days = chunk[DATE].dt.normalize()
+    codes, unique_days = pd.factorize(days)
+    iso = pd.DatetimeIndex(unique_days).isocalendar()
+    weeks = np.append((iso["year"] * 100 + iso["week"]).astype(str).to_numpy(dtype=object), None)
+    vehicle = chunk[VEHICLE_TYPE].astype("category")
+    if "Ukendt" not in vehicle.cat.categories:
+        vehicle = vehicle.cat.add_categories("Ukendt")
+    return pd.DataFrame(
+        {
+            "RouteId": chunk[ROUTE_ID],
+            "Dato": days,
+            "Uge": weeks[codes],
+            "Køretøjstype": vehicle.fillna("Ukendt"),
+            "Km": km,
+            "CO2 (kg)": km * factor,
+            "UkendtType": unknown,
+        }
+    )
+
+def _summary(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    out = df.groupby(by, observed=True).agg(
+        Ruter=("RouteId", "nunique"), Km=("Km", "sum"), CO2=("CO2 (kg)", "sum")
+    )
+    out["CO2 pr. km (kg)"] = (out["CO2"] / out["Km"].where(out["Km"] > 0)).round(3)
+    return out.rename(columns={"CO2": "CO2 (kg)"}).round({"Km": 1, "CO2 (kg)": 1}).reset_index()
+
+def compute_co2(uploaded, factors: EmissionFactors | None = None, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """
+    CO2 pr. rute, pr. køretøjstype og pr. ISO-uge. Filen læses i bidder,
+    og faktoren joines på hele bidden på én gang. Returnerer et dict med
+    per_route, per_vehicle, per_week, rows og unknown_types.
+    """
+    factors = factors or load_emission_factors()
+    parts = [_route_emissions(chunk, factors) for chunk in iter_table_chunks(uploaded, CO2_SCHEMA, chunk_rows)]
+    if not parts:
+        raise ValueError("Filen indeholder ingen ruter.")
+    rows = pd.concat(parts, ignore_index=True)
+    # Bidderne kan have forskellige kategorier – saml dem til én kategorisk kolonne
+    rows["Køretøjstype"] = rows["Køretøjstype"].astype("category")
+
+    per_route = (
+        rows.groupby("RouteId", sort=False)
+        .agg(
+            Dato=("Dato", "first"),
+            Uge=("Uge", "first"),
+            Køretøjstype=("Køretøjstype", "first"),
+            Km=("Km", "sum"),
+            CO2=("CO2 (kg)", "sum"),
+        )
+        .rename(columns={"CO2": "CO2 (kg)"})
+        .round({"Km": 1, "CO2 (kg)": 2})
+        .reset_index()
+    )
+    unknown = rows.loc[rows["UkendtType"], "Køretøjstype"].astype(str).unique().tolist()
+    return {
+        "rows": len(rows),
+        "per_route": per_route,
+        "per_vehicle": _summary(rows, "Køretøjstype"),
+        "per_week": _summary(rows, "Uge"),
+        "unknown_types": sorted(unknown),
+    }
+
+# --- Cache ------------------------------------------------------------------
+
+_results: OrderedDict[tuple, dict] = OrderedDict()
+_results_lock = threading.Lock()
+
+def _lookup(key: tuple) -> dict | None:
+    with _results_lock:
+        result = _results.get(key)
+        if result is not None:
+            _results.move_to_end(key)
+        return result
+
+def cached_co2_report(uploaded, factors: EmissionFactors | None = None) -> dict | None:
+    """Resultatet fra `co2_report`, hvis filen allerede er beregnet; ellers None."""
+    factors = factors or load_emission_factors()
+    return _lookup((content_hash(upload_bytes(uploaded)), factors.fingerprint))
+
+def co2_report(uploaded, factors: EmissionFactors | None = None) -> dict:
+    """
+    Som `compute_co2`, men cachet mod et hash af filens indhold og
+    faktortabellen, så samme fil kun beregnes én gang pr. proces.
+    """
+    factors = factors or load_emission_factors()
+    key = (content_hash(upload_bytes(uploaded)), factors.fingerprint)
+    result = _lookup(key)
+    if result is not None:
+        return result
+
+    result = compute_co2(uploaded, factors)
+    with _results_lock:
+        _results[key] = result
+        while len(_results) > MAX_CACHED_RESULTS:
+            _results.popitem(last=False)
+    return result
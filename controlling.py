@@ -1,133 +1,180 @@
-import io
+import os
 from datetime import date, timedelta
 
 import pandas as pd
 import streamlit as st
-import json
-import os
-from datetime import datetime
+
+from controlling_pipeline import (
+    CONTROLLING_SCHEMA,
+    analyze_controlling_files,
+    detect_yearweek_from_dates,
+    pick_week_results,
+    run_controlling_pipeline,
+    run_incremental_pipeline,
+    store_week_result,
+)
+from export import download_df
+from ingest import (
+    UPLOAD_TYPES,
+    content_hash,
+    frame_hash,
+    list_input_files,
+    read_table,
+    upload_bytes,
+    validate_upload,
+)
+from perf import instrumented, stage
 
 
 # --- Hjælpefunktioner -------------------------------------------------------
 
-LOG_PATH = "data/controlling_weekly_log.json"
+# Antal kundekort pr. side i resultatvisningen
+CARDS_PER_PAGE = 20
 
-def _ensure_log_dir():
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+# --- Backfill ---------------------------------------------------------------
 
-def read_weekly_log() -> dict:
-    _ensure_log_dir()
-    if not os.path.exists(LOG_PATH):
-        return {}
-    try:
-        with open(LOG_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data if isinstance(data, dict) else {}
-    except Exception:
-        return {}
-
-def write_weekly_log(data: dict) -> None:
-    _ensure_log_dir()
-    tmp_path = LOG_PATH + ".tmp"
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp_path, LOG_PATH)
-
-def detect_yearweek_from_dates(df: pd.DataFrame) -> str | None:
-    if "Date" not in df.columns:
-        return None
-    s = pd.to_datetime(df["Date"], errors="coerce")
-    s = s.dropna()
-    if s.empty:
-        return None
-    iso = s.dt.isocalendar()
-    yearweek = (iso["year"].astype(str) + iso["week"].astype(int).map(lambda w: f"{w:02d}"))
-    # brug mest almindelige uge i filen
-    return yearweek.value_counts().index[0]
-
-def log_controlling_count(yearweek: str, count: int) -> None:
-    log = read_weekly_log()
-    log[str(yearweek)] = {
-        "count": int(count),
-        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M"),
-    }
-    write_weekly_log(log)
-
-def download_df(df: pd.DataFrame, label: str, file_name: str) -> None:
-    """Download en DataFrame som Excel-fil via Streamlit."""
-    buf = io.BytesIO()
-    df.to_excel(buf, index=False, engine="xlsxwriter")
-    st.download_button(
-        label=label,
-        data=buf.getvalue(),
-        file_name=file_name,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+def backfill_section() -> None:
+    st.subheader("Backfill af historik")
+    st.caption(
+        "Analysér mange DurationControlling-filer på én gang. Filerne behandles "
+        "parallelt, og hver uges resultat og antal skrives til historikken."
     )
 
-def filter_by_realized_time(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Frasortér alle ruter med realiseret tid (ActDuration) under:
-      - 180 minutter (3 timer) for alle kunder
-      - 150 minutter (2,5 time) for 'Brød Cooperativet'
-    """
-
-    duration_col = "ActDuration"
-
-    if duration_col not in df.columns:
-        st.error(
-            f"Kolonnen '{duration_col}' blev ikke fundet i data. "
-            "Tjek at du har uploadet en DurationControlling-rapport."
-        )
-        return df
-
-    out = df.copy()
-    out[duration_col] = pd.to_numeric(out[duration_col], errors="coerce")
-
-    # Sikre CustomerName som str
-    cust_name = out["CustomerName"].fillna("").astype(str)
+    uploads = st.file_uploader(
+        "Upload flere DurationControlling-rapporter",
+        type=UPLOAD_TYPES,
+        accept_multiple_files=True,
+        key="controlling_backfill_files",
+    )
+    directory = st.text_input(
+        "…eller angiv en lokal mappe med rapporter", key="controlling_backfill_dir"
+    )
 
-    is_brod = cust_name == "Brød Cooperativet"
-    brod_ok = is_brod & (out[duration_col] >= 150)
-    other_ok = ~is_brod & (out[duration_col] >= 180)
+    jobs = [(u.getvalue(), u.name) for u in uploads or []]
+    if directory.strip():
+        if not os.path.isdir(directory):
+            st.error(f"Mappen '{directory}' findes ikke.")
+            return
+        jobs += [(path, os.path.basename(path)) for path in list_input_files(directory)]
 
-    return out[brod_ok | other_ok].copy()
+    if not jobs:
+        return
+    st.write(f"{len(jobs)} filer klar til backfill.")
+    if not st.button("Start backfill", key="controlling_backfill_start"):
+        return
 
-# --- Analysefunktion --------------------------------------------------------
+    progress = st.progress(0.0, text="Starter …")
+    analysed, errors = [], []
+    for done, res in enumerate(analyze_controlling_files(jobs), start=1):
+        if "error" in res:
+            errors.append((res["name"], res["error"]))
+        else:
+            analysed.append(res)
+        progress.progress(done / len(jobs), text=f"{done}/{len(jobs)} filer analyseret")
+
+    # Flere filer for samme uge: vælg fast efter filnavn, ikke efter hvem der blev færdig først
+    results, duplicates = pick_week_results(analysed)
+    errors += duplicates
+
+    for week in sorted(results):
+        res = results[week]
+        store_week_result(week, res["result"], res["fingerprints"])
+    progress.progress(1.0, text="Færdig")
+
+    summary = pd.DataFrame(
+        [
+            {
+                "Uge": week,
+                "Fil": res["name"],
+                "Ruter i filen": res["rows"],
+                "Ruter til kontrol": len(res["result"]),
+            }
+            for week, res in sorted(results.items())
+        ]
+    )
+    st.success(f"{len(results)} uger skrevet til historikken.")
+    if not summary.empty:
+        st.dataframe(summary, use_container_width=True)
+    for name, error in errors:
+        st.warning(f"{name}: {error}")
+
+# --- Kundekort -------------------------------------------------------------
+
+DISPLAY_COLUMNS = [
+    "SessionId",
+    "Date",
+    "CustomerName",
+    "EstDuration",
+    "ActDuration",
+    "Price",
+    "ActPrice",
+    "QuickNotes",   # <- TILFØJET IGEN
+    "QuickNotesCategory",
+]
+
+def _customer_card_html(cust: str, grp: pd.DataFrame) -> str:
+    # Kun de ønskede kolonner i tabellen
+    table_html = grp[DISPLAY_COLUMNS].to_html(index=False)
+    return f"""
+            <div class="card" style="margin-bottom: 18px;">
+              <div style="font-size:1.05em; font-weight:600; margin-bottom:4px;">
+                {cust}
+              </div>
+              <div style="font-size:0.85em; color:#4A6275; margin-bottom:10px;">
+                Antal ruter: {len(grp)}
+              </div>
+              <div style="overflow-x:auto;">
+                {table_html}
+              </div>
+            </div>
+            """
 
-def analyze_quicknotes(df: pd.DataFrame) -> pd.DataFrame:
+def render_customer_cards(df_q: pd.DataFrame) -> None:
     """
-    Filtrér kun ruter hvor QuickNotes indeholder én af:
-      - "Solutions - Delay - Extra time spent (S)"
-      - "Solutions - Customer deviation"
+    Viser ét kort pr. kunde med søgefelt og sideinddeling. Grupperingen og
+    den færdige HTML pr. kunde gemmes i sessionen mod et hash af
+    analyseresultatet, så en rerun kun bygger de kort, der vises.
     """
-    patterns = [
-        "Solutions - Delay - Extra time spent (S)",
-        "Solutions - Customer deviation",
-    ]
-
-    out = df.copy()
-    series = out["QuickNotes"].fillna("").astype(str).str.lower()
+    result_key = frame_hash(df_q)
+    cache = st.session_state.get("controlling_cards")
+    if cache is None or cache["key"] != result_key:
+        groups = df_q.groupby("CustomerName", observed=True).indices
+        cache = {
+            "key": result_key,
+            "groups": dict(sorted(groups.items(), key=lambda x: str(x[0]))),
+            "html": {},
+        }
+        st.session_state["controlling_cards"] = cache
+
+    query = st.text_input("Søg efter kunde", key="controlling_card_search").strip().lower()
+    customers = [c for c in cache["groups"] if query in str(c).lower()]
+    if not customers:
+        st.info("Ingen kunder matcher søgningen.")
+        return
 
-    out["QuickNotesMatch"] = series.apply(
-        lambda txt: any(p.lower() in txt for p in patterns)
+    n_pages = (len(customers) - 1) // CARDS_PER_PAGE + 1
+    page = 1
+    if n_pages > 1:
+        page = int(st.number_input(
+            f"Side (af {n_pages})", min_value=1, max_value=n_pages, value=1, step=1,
+            key=f"controlling_card_page_{len(customers)}",
+        ))
+    start = (page - 1) * CARDS_PER_PAGE
+    st.caption(
+        f"Viser kunde {start + 1}–{min(start + CARDS_PER_PAGE, len(customers))} "
+        f"af {len(customers)}"
     )
 
-    # Behold kolonnerne til tabellen
-    return out[out["QuickNotesMatch"]][
-        [
-            "SessionId",
-            "Date",
-            "CustomerName",
-            "EstDuration",
-            "ActDuration",
-            "Price",
-            "ActPrice",
-            "QuickNotes",
-        ]
-    ]
+    for cust in customers[start:start + CARDS_PER_PAGE]:
+        html = cache["html"].get(cust)
+        if html is None:
+            html = _customer_card_html(cust, df_q.iloc[cache["groups"][cust]])
+            cache["html"][cust] = html
+        st.markdown(html, unsafe_allow_html=True)
 
 # --- Streamlit-faneblad -----------------------------------------------------
 
+@instrumented("controlling")
 def controlling_tab():
     st.header("Controlling-analyse – QuickNotes (Solutions deviations)")
 
@@ -153,45 +200,96 @@ def controlling_tab():
 
     st.markdown("---")
 
-    # Upload
-    uploaded = st.file_uploader(
-        "Upload din DurationControlling-rapport (.xlsx)", type=["xlsx"]
+    mode = st.radio(
+        "Tilstand", ["Enkelt uge", "Backfill (flere uger)"], horizontal=True, key="controlling_mode"
     )
-    if not uploaded:
+    if mode != "Enkelt uge":
+        backfill_section()
         return
 
-    df = pd.read_excel(uploaded)
-
-    # Robust frasortering af udvalgte IKEA-kunder
-    exclude_customers_raw = ["IKEA Norway", "IKEA BE", "IKEA NL"]
-    df["CustomerName_clean"] = (
-        df["CustomerName"]
-        .fillna("")
-        .astype(str)
-        .str.strip()
-        .str.lower()
+    # Upload
+    uploaded = st.file_uploader(
+        "Upload din DurationControlling-rapport (.xlsx, .csv, .csv.gz eller .parquet)",
+        type=UPLOAD_TYPES,
     )
-    exclude_customers = [name.lower() for name in exclude_customers_raw]
-    df = df[~df["CustomerName_clean"].isin(exclude_customers)].copy()
-    df.drop(columns=["CustomerName_clean"], inplace=True)
-
-    # Frasortér ruter ud fra realiseret tid (ActDuration)
-    df = filter_by_realized_time(df)
-
-    if df.empty:
-        st.warning("Ingen ruter opfylder kravet til minimum realiseret tid efter filtrering.")
+    if not uploaded:
         return
 
-    # Fjern rækker uden QuickNotes-tekst
-    quick_str = df["QuickNotes"].fillna("").astype(str)
-    df = df[quick_str.str.strip() != ""].copy()
-
-    if df.empty:
-        st.warning("Ingen ruter med QuickNotes-tekst tilbage efter filtrering.")
+    # Tjek overskrifterne, før hele filen parses
+    try:
+        with stage("Tjek af kolonner"):
+            validate_upload(uploaded, CONTROLLING_SCHEMA)
+    except ValueError as e:
+        st.error(f"{e}. Tjek at du har uploadet en DurationControlling-rapport.")
         return
 
-    # QuickNotes-analyse
-    df_q = analyze_quicknotes(df)
+    # Analysen køres og gemmes kun én gang pr. upload. Reruns (søgning,
+    # sideskift) genbruger resultatet – ellers ville de blive sammenlignet
+    # med de fingeraftryk, den første kørsel netop har gemt.
+    upload_key = content_hash(upload_bytes(uploaded))
+    analysis = st.session_state.get("controlling_analysis")
+    if analysis is None or analysis["key"] != upload_key:
+        with stage("Indlæsning") as s:
+            df = read_table(uploaded, CONTROLLING_SCHEMA)
+            s.output(df)
+
+        with stage("Filtrering") as s:
+            s.input(df)
+            week = detect_yearweek_from_dates(df)
+            if week is not None:
+                df_q, stages, fingerprints, changes = run_incremental_pipeline(df, week)
+            else:
+                df_q, stages = run_controlling_pipeline(df)
+                changes = None
+            s.output(df_q)
+
+        # Log ugens antal og ruter til historikken
+        if week is not None:
+            with stage("Gem historik") as s:
+                store_week_result(week, df_q, fingerprints)
+                s.input(df_q)
+
+        analysis = {
+            "key": upload_key,
+            "week": week,
+            "df_q": df_q,
+            "stages": stages,
+            "changes": changes,
+        }
+        st.session_state["controlling_analysis"] = analysis
+
+    week, df_q = analysis["week"], analysis["df_q"]
+    stages, changes = analysis["stages"], analysis["changes"]
+
+    if changes is not None:
+        st.info(
+            f"Uge {week} er analyseret før – kun nye og ændrede ruter er kørt igennem. "
+            f"Nye: {changes['new']}, ændrede: {changes['changed']}, "
+            f"uændrede: {changes['unchanged']}, fjernet fra filen: {changes['removed']}."
+        )
+        with st.expander("Ændringer i resultatet siden sidste upload"):
+            st.write(f"Nye ruter i resultatet: **{len(changes['added_to_result'])}**")
+            if not changes["added_to_result"].empty:
+                st.dataframe(changes["added_to_result"])
+            st.write(f"Ruter der ikke længere er med: **{len(changes['dropped_from_result'])}**")
+            if not changes["dropped_from_result"].empty:
+                st.dataframe(changes["dropped_from_result"])
+
+    with st.expander("Filtrering trin for trin"):
+        if changes is not None:
+            st.caption("Trinene gælder kun de nye og ændrede ruter.")
+        st.table(pd.DataFrame(stages, columns=["Trin", "Ruter"]))
+
+    # Trinene fra en inkrementel kørsel dækker kun de nye og ændrede ruter
+    stage_counts = dict(stages)
+    if changes is None:
+        if stage_counts["Efter minimum realiseret tid"] == 0:
+            st.warning("Ingen ruter opfylder kravet til minimum realiseret tid efter filtrering.")
+            return
+
+        if stage_counts["Med QuickNotes-tekst"] == 0:
+            st.warning("Ingen ruter med QuickNotes-tekst tilbage efter filtrering.")
+            return
 
     if df_q.empty:
         st.write("Ingen ruter med de valgte QuickNotes efter alle filtreringer.")
@@ -210,44 +308,17 @@ def controlling_tab():
     )
 
     # --- Apple-lignende kort pr. kunde --------------------------------------
-    display_cols = [
-        "SessionId",
-        "Date",
-        "CustomerName",
-        "EstDuration",
-        "ActDuration",
-        "Price",
-        "ActPrice",
-        "QuickNotes",   # <- TILFØJET IGEN
-    ]
-
-    for cust, grp in sorted(df_q.groupby("CustomerName"), key=lambda x: x[0]):
-        # Kun de ønskede kolonner i tabellen
-        table_html = grp[display_cols].to_html(index=False)
-
-        st.markdown(
-            f"""
-            <div class="card" style="margin-bottom: 18px;">
-              <div style="font-size:1.05em; font-weight:600; margin-bottom:4px;">
-                {cust}
-              </div>
-              <div style="font-size:0.85em; color:#4A6275; margin-bottom:10px;">
-                Antal ruter: {len(grp)}
-              </div>
-              <div style="overflow-x:auto;">
-                {table_html}
-              </div>
-            </div>
-            """,
-            unsafe_allow_html=True,
-        )
+    with stage("Kundekort") as s:
+        s.input(df_q)
+        render_customer_cards(df_q)
 
     # Download-knap til hele analysen
-    download_df(
-        df_q,
-        "Download QuickNotes-analyse",
-        "quicknotes_solutions_analyse.xlsx",
-    )
+    with stage("Download-knapper"):
+        download_df(
+            df_q,
+            "Download QuickNotes-analyse",
+            "quicknotes_solutions_analyse.xlsx",
+        )
 
 if __name__ == "__main__":
     st.set_page_config(page_title="CS Automation – Controlling")
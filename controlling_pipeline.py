@@ -0,0 +1,265 @@
+# controlling_pipeline.py
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from history_store import record_week
+from ingest import TableSchema, check_header, parse_table, upload_bytes, upload_format
+from route_rules import RouteRules, customer_keys, load_route_rules
+from route_store import (
+    delete_week_fingerprints,
+    read_routes,
+    read_week_fingerprints,
+    write_week_fingerprints,
+    write_week_routes,
+)
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "controlling_rules.json")
+
+# --- Hjælpefunktioner -------------------------------------------------------
+
+# Alle kolonner bruges af analysen og skal derfor findes i rapporten
+CONTROLLING_COLUMNS = (
+    "SessionId",
+    "Date",
+    "CustomerName",
+    "EstDuration",
+    "ActDuration",
+    "Price",
+    "ActPrice",
+    "QuickNotes",
+)
+
+CONTROLLING_SCHEMA = TableSchema(
+    columns=CONTROLLING_COLUMNS,
+    numeric=("EstDuration", "ActDuration", "Price", "ActPrice"),
+    categorical=("CustomerName",),
+    dates=("Date",),
+    required=CONTROLLING_COLUMNS,
+)
+
+def detect_yearweek_from_dates(df: pd.DataFrame) -> str | None:
+    if "Date" not in df.columns:
+        return None
+    s = pd.to_datetime(df["Date"], errors="coerce")
+    s = s.dropna()
+    if s.empty:
+        return None
+    iso = s.dt.isocalendar()
+    yearweek = (iso["year"].astype(str) + iso["week"].astype(int).map(lambda w: f"{w:02d}"))
+    # brug mest almindelige uge i filen
+    return yearweek.value_counts().index[0]
+
+# --- Analysefunktion --------------------------------------------------------
+
+RESULT_COLUMNS = [
+    "SessionId",
+    "Date",
+    "CustomerName",
+    "EstDuration",
+    "ActDuration",
+    "Price",
+    "ActPrice",
+    "QuickNotes",
+]
+
+# Kundespecifikke tidskrav, frasorterede kunder og QuickNotes-kategorier
+RULES = load_route_rules(RULES_PATH)
+
+def analyze_quicknotes(df: pd.DataFrame, rules: RouteRules = RULES) -> pd.DataFrame:
+    """
+    Filtrér kun ruter hvor QuickNotes indeholder én af kategorierne i
+    controlling_rules.json (fx "Solutions - Customer deviation").
+
+    Kolonnen QuickNotesCategory angiver den første kategori (i filens
+    rækkefølge), der matchede på ruten.
+    """
+    category = rules.quicknotes_category(df["QuickNotes"])
+    matched = category.notna()
+
+    # Behold kolonnerne til tabellen
+    return df.loc[matched, RESULT_COLUMNS].assign(QuickNotesCategory=category[matched])
+
+def run_controlling_pipeline(
+    df: pd.DataFrame, rules: RouteRules = RULES
+) -> tuple[pd.DataFrame, list[tuple[str, int]]]:
+    """
+    Kører hele controlling-filtreringen som én samlet maske og tager først
+    et udsnit af data til allersidst. Returnerer resultatet samt antal ruter
+    tilbage efter hvert trin (til diagnostik).
+    """
+    stages = [("Indlæst", len(df))]
+
+    # Robust frasortering af udvalgte kunder (fx IKEA)
+    keys = customer_keys(df["CustomerName"])
+    mask = ~rules.excluded(keys)
+    stages.append(("Efter frasortering af kunder", int(mask.sum())))
+
+    # Minimum realiseret tid (ActDuration) pr. kunde
+    mask &= df["ActDuration"] >= rules.min_duration(keys)
+    stages.append(("Efter minimum realiseret tid", int(mask.sum())))
+
+    # Kun rækker med QuickNotes-tekst
+    mask &= df["QuickNotes"].fillna("").astype(str).str.strip() != ""
+    stages.append(("Med QuickNotes-tekst", int(mask.sum())))
+
+    # Mønster-matchet køres kun på de rækker, der stadig er med
+    category = rules.quicknotes_category(df.loc[mask, "QuickNotes"])
+    matched = category.notna()
+    stages.append(("Matcher QuickNotes-kategori", int(matched.sum())))
+
+    keep = matched.index[matched]
+    out = df.loc[keep, RESULT_COLUMNS].assign(QuickNotesCategory=category[keep])
+    return out, stages
+
+# --- Inkrementel genanalyse ------------------------------------------------
+
+def session_ids(ids: pd.Series) -> pd.Series:
+    """SessionId som tekst; tomme celler bliver "" i stedet for NaN."""
+    return ids.astype(object).where(ids.notna(), "").map(str)
+
+def unique_session_ids(ids: pd.Series) -> bool:
+    """Ruter kan kun genkendes mellem uploads, hvis alle SessionId'er er udfyldte og unikke."""
+    return not (ids.eq("").any() or ids.duplicated().any())
+
+def row_fingerprints(df: pd.DataFrame) -> pd.DataFrame:
+    """Ét hash pr. uploadet række over skemaets kolonner, nøglet på SessionId."""
+    cols = [c for c in CONTROLLING_SCHEMA.columns if c in df.columns]
+    return pd.DataFrame(
+        {
+            "SessionId": session_ids(df["SessionId"]).to_numpy(),
+            "RowHash": pd.util.hash_pandas_object(df[cols], index=False).to_numpy(),
+        },
+        index=df.index,
+    )
+
+def run_incremental_pipeline(
+    df: pd.DataFrame, yearweek: str, rules: RouteRules = RULES
+) -> tuple[pd.DataFrame, list[tuple[str, int]], pd.DataFrame, dict | None]:
+    """
+    Som `run_controlling_pipeline`, men genbruger resultatet fra en tidligere
+    upload af samme uge: kun nye eller ændrede ruter (målt på et hash pr.
+    SessionId) køres gennem filtrene, og resten hentes fra historikken.
+
+    Returnerer (resultat, trin, fingeraftryk for uploadet, ændringer). Ændringer
+    er None, når hele filen er analyseret forfra (første upload, ændrede regler
+    eller tomme/dublerede SessionId'er).
+    """
+    fingerprints = row_fingerprints(df)
+    previous = read_week_fingerprints(yearweek)
+    if (
+        previous is None
+        or previous[1] != rules.fingerprint
+        or not unique_session_ids(fingerprints["SessionId"])
+        or not unique_session_ids(session_ids(previous[0]["SessionId"]))
+    ):
+        df_q, stages = run_controlling_pipeline(df, rules)
+        return df_q, stages, fingerprints, None
+
+    prev_fp = previous[0]
+    prev_ids = pd.Index(prev_fp["SessionId"])
+    pos = prev_ids.get_indexer(fingerprints["SessionId"])
+    is_new = pos == -1
+    prev_hash = prev_fp["RowHash"].to_numpy()[pos]
+    is_changed = ~is_new & (prev_hash != fingerprints["RowHash"].to_numpy())
+    unchanged = ~(is_new | is_changed)
+    n_removed = int((~prev_ids.isin(fingerprints["SessionId"])).sum())
+
+    # Uændrede ruter beholder deres tidligere kategori (None = matchede ikke)
+    prev_routes = read_routes([yearweek], ["SessionId", "QuickNotesCategory"])
+    prev_category = prev_routes.set_index("SessionId")["QuickNotesCategory"]
+    kept_category = fingerprints.loc[unchanged, "SessionId"].map(prev_category).dropna()
+    kept = df.loc[kept_category.index, RESULT_COLUMNS].assign(QuickNotesCategory=kept_category)
+
+    # Kun nye og ændrede ruter køres gennem filtrene
+    delta_q, stages = run_controlling_pipeline(df[~unchanged], rules)
+    df_q = pd.concat([kept, delta_q]).sort_index()
+
+    result_ids = fingerprints.loc[df_q.index, "SessionId"]
+    new_ids = set(result_ids)
+    old_ids = set(prev_category.index)
+    changes = {
+        "new": int(is_new.sum()),
+        "changed": int(is_changed.sum()),
+        "unchanged": int(unchanged.sum()),
+        "removed": n_removed,
+        "added_to_result": df_q[result_ids.isin(new_ids - old_ids).to_numpy()],
+        "dropped_from_result": prev_routes[prev_routes["SessionId"].isin(old_ids - new_ids)],
+    }
+    return df_q, stages, fingerprints, changes
+
+# --- Filer og historik ------------------------------------------------------
+
+def analyze_controlling_file(source, name: str) -> dict:
+    """
+    Parser og analyserer én DurationControlling-fil uden Streamlit. `source`
+    er en filsti eller filens bytes. Køres i en separat proces under backfill,
+    så resultatet returneres i stedet for at blive skrevet til historikken.
+    """
+    try:
+        data, fmt = upload_bytes(source), upload_format(name)
+        check_header(data, fmt, CONTROLLING_SCHEMA)
+        df = parse_table(data, fmt, CONTROLLING_SCHEMA)
+        week = detect_yearweek_from_dates(df)
+        if week is None:
+            return {"name": name, "error": "Kunne ikke finde en uge ud fra Date-kolonnen."}
+        df_q, _ = run_controlling_pipeline(df)
+        return {
+            "name": name,
+            "week": week,
+            "result": df_q,
+            "fingerprints": row_fingerprints(df),
+            "rows": len(df),
+        }
+    except Exception as e:
+        return {"name": name, "error": str(e)}
+
+def store_week_result(week: str, df_q: pd.DataFrame, fingerprints: pd.DataFrame) -> None:
+    """Skriver en analyseret uge til historikken (antal, aggregater, ruter og fingeraftryk)."""
+    record_week(week, df_q)
+    write_week_routes(week, df_q)
+    if unique_session_ids(fingerprints["SessionId"]):
+        write_week_fingerprints(week, fingerprints, RULES.fingerprint)
+    else:
+        # Uden entydige SessionId'er kan ugen ikke genanalyseres inkrementelt –
+        # næste upload af ugen analyseres derfor forfra
+        delete_week_fingerprints(week)
+
+def pick_week_results(results: list[dict]) -> tuple[dict[str, dict], list[tuple[str, str]]]:
+    """
+    Vælger ét resultat pr. uge, når flere filer dækker samme ISO-uge: filen
+    hvis navn sorterer sidst vinder, uanset hvilken proces blev færdig først.
+    Returnerer (resultat pr. uge, advarsler for de fravalgte filer).
+    """
+    chosen: dict[str, dict] = {}
+    skipped = []
+    for res in sorted(results, key=lambda r: (os.path.basename(r["name"]), r["name"])):
+        if res["week"] in chosen:
+            skipped.append(chosen[res["week"]])
+        chosen[res["week"]] = res
+    warnings = [
+        (
+            res["name"],
+            f"Uge {res['week']} findes også i {chosen[res['week']]['name']} – "
+            f"den fil bruges, denne springes over.",
+        )
+        for res in skipped
+    ]
+    return chosen, warnings
+
+def analyze_controlling_files(jobs: list[tuple], workers: int | None = None):
+    """
+    Analyserer (kilde, navn)-par parallelt i en procespulje og giver
+    resultaterne fra `analyze_controlling_file` efterhånden som de bliver klar.
+    """
+    if not jobs:
+        return
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    # "spawn" i stedet for fork, da Streamlit-serveren kører flere tråde
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(analyze_controlling_file, source, name) for source, name in jobs]
+        for future in as_completed(futures):
+            yield future.result()
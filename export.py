@@ -0,0 +1,131 @@
+# export.py
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from ingest import frame_hash
+from perf import deferred
+
+# Over denne størrelse skrives xlsx række for række i xlsxwriters constant_memory-tilstand
+CONSTANT_MEMORY_ROWS = 50_000
+# Samlet øvre grænse for færdige eksportfiler, der holdes i cachen
+MAX_EXPORT_CACHE_BYTES = 256 * 1024 * 1024
+_CHUNK_ROWS = 10_000
+
+EXPORT_FORMATS = {
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV", "text/csv"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+}
+
+# --- Serialisering ----------------------------------------------------------
+
+def _xlsx_constant_memory(df: pd.DataFrame, sheet_name: str) -> bytes:
+    """Skriver store DataFrames række for række, så kun én række ad gangen holdes i hukommelsen."""
+    import xlsxwriter
+
+    buf = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buf, {
+        "constant_memory": True,
+        "nan_inf_to_errors": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    sheet = workbook.add_worksheet(sheet_name)
+    sheet.write_row(0, 0, [str(c) for c in df.columns])
+    row = 1
+    for start in range(0, len(df), _CHUNK_ROWS):
+        chunk = df.iloc[start:start + _CHUNK_ROWS]
+        # Python-objekter med None for manglende værdier (NaN/NaT)
+        columns = [s.astype(object).where(s.notna(), None).tolist() for _, s in chunk.items()]
+        for values in zip(*columns):
+            sheet.write_row(row, 0, values)
+            row += 1
+    workbook.close()
+    return buf.getvalue()
+
+def _parquet_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parquet kræver én type pr. kolonne. Fritekstkolonner fra Excel blander
+    ofte tal og tekst (fx RouteId), så de skrives som tekst.
+    """
+    mixed = [
+        c for c in df.columns
+        if df[c].dtype == object
+        and pd.api.types.infer_dtype(df[c], skipna=True).startswith("mixed")
+    ]
+    if not mixed:
+        return df
+    return df.assign(**{c: df[c].map(str, na_action="ignore") for c in mixed})
+
+def to_bytes(df: pd.DataFrame, fmt: str, sheet_name: str = "Sheet1") -> bytes:
+    """Serialiserer en DataFrame som 'xlsx', 'csv' eller 'parquet'."""
+    if fmt == "csv":
+        # BOM, så Excel viser æøå korrekt
+        return df.to_csv(index=False).encode("utf-8-sig")
+    if fmt == "parquet":
+        buf = io.BytesIO()
+        _parquet_safe(df).to_parquet(buf, index=False)
+        return buf.getvalue()
+    if len(df) > CONSTANT_MEMORY_ROWS:
+        return _xlsx_constant_memory(df, sheet_name)
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
+        df.to_excel(writer, index=False, sheet_name=sheet_name)
+    return buf.getvalue()
+
+# --- Cache ------------------------------------------------------------------
+
+_cache: OrderedDict[tuple, bytes] = OrderedDict()
+_cache_size = 0
+_cache_lock = threading.Lock()
+
+def export_bytes(df: pd.DataFrame, fmt: str, sheet_name: str = "Sheet1") -> bytes:
+    """
+    Som `to_bytes`, men cachet mod et hash af DataFrame'ens indhold, så den
+    samme analyse kun serialiseres én gang pr. format.
+    """
+    global _cache_size
+    key = (frame_hash(df), fmt, sheet_name)
+    with _cache_lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+            return data
+
+    data = to_bytes(df, fmt, sheet_name)
+    if len(data) <= MAX_EXPORT_CACHE_BYTES:
+        with _cache_lock:
+            if key not in _cache:
+                _cache[key] = data
+                _cache_size += len(data)
+            while _cache_size > MAX_EXPORT_CACHE_BYTES:
+                _, evicted = _cache.popitem(last=False)
+                _cache_size -= len(evicted)
+    return data
+
+# --- Streamlit --------------------------------------------------------------
+
+def download_df(df: pd.DataFrame, label: str, file_name: str, sheet_name: str = "Sheet1") -> None:
+    """
+    Viser download-knapper for Excel, CSV og Parquet. Filen bygges først,
+    når der klikkes på en knap – ikke ved hver rerun.
+    """
+    # Importeres her, så serialiseringen kan bruges uden Streamlit (fx fra cli.py)
+    import streamlit as st
+
+    base, _ = os.path.splitext(file_name)
+    cols = st.columns(len(EXPORT_FORMATS))
+    for col, (fmt, (fmt_label, mime)) in zip(cols, EXPORT_FORMATS.items()):
+        with col:
+            st.download_button(
+                label=f"{label} ({fmt_label})",
+                data=deferred(f"Eksport ({fmt})", lambda fmt=fmt: export_bytes(df, fmt, sheet_name)),
+                file_name=f"{base}.{fmt}",
+                mime=mime,
+                key=f"download_{base}_{fmt}",
+                on_click="ignore",
+            )
@@ -0,0 +1,218 @@
+# history_store.py
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from route_store import delete_week_routes, stored_weeks
+
+# Ved siden af modulet, så appen og cli.py bruger samme historik uanset arbejdsmappe
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+DB_PATH = os.path.join(DATA_DIR, "controlling_history.sqlite")
+# Den tidligere JSON-log importeres automatisk første gang databasen oprettes
+LEGACY_LOG_PATH = os.path.join(DATA_DIR, "controlling_weekly_log.json")
+
+_SCHEMA_VERSION = 3
+
+# --- Forbindelse ------------------------------------------------------------
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= _SCHEMA_VERSION:
+        return
+    with conn:
+        if version < 1:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS weekly_counts (
+                    yearweek   TEXT PRIMARY KEY,
+                    count      INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            if os.path.exists(LEGACY_LOG_PATH):
+                try:
+                    with open(LEGACY_LOG_PATH, "r", encoding="utf-8") as f:
+                        legacy = json.load(f)
+                except Exception:
+                    legacy = {}
+                if isinstance(legacy, dict):
+                    _upsert_counts(conn, legacy)
+        if version < 2:
+            # Forudberegnede ugetal til Overblik, opdateres når en uge logges
+            for table, key in (("agg_customer_week", "customer"), ("agg_category_week", "category")):
+                conn.execute(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        yearweek      TEXT NOT NULL,
+                        {key}         TEXT NOT NULL,
+                        routes        INTEGER NOT NULL,
+                        extra_minutes REAL NOT NULL,
+                        price_delta   REAL NOT NULL,
+                        PRIMARY KEY (yearweek, {key})
+                    )
+                    """
+                )
+        if version < 3:
+            # Estimeret årlig omsætning pr. kunde fra Revenue-fanen, gemt på tværs af uger
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS revenue_estimates (
+                    customer_id   TEXT PRIMARY KEY,
+                    est_potential REAL NOT NULL,
+                    updated_at    TEXT NOT NULL
+                )
+                """
+            )
+        conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+def connect() -> sqlite3.Connection:
+    """
+    Åbner historikdatabasen i WAL-tilstand, så flere sessioner kan læse
+    samtidig med at én skriver. Skrivninger venter op til 30 sek. på lås.
+    """
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _migrate(conn)
+    return conn
+
+# --- Ugentlige antal --------------------------------------------------------
+
+def _upsert_counts(conn: sqlite3.Connection, log: dict) -> None:
+    rows = [
+        (str(yearweek), int(payload.get("count", 0)), str(payload.get("updated_at", "")))
+        for yearweek, payload in log.items()
+        if isinstance(payload, dict)
+    ]
+    conn.executemany(
+        """
+        INSERT INTO weekly_counts (yearweek, count, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(yearweek) DO UPDATE SET
+            count = excluded.count,
+            updated_at = excluded.updated_at
+        """,
+        rows,
+    )
+
+def _week_aggregates(df_q: pd.DataFrame, key_col: str) -> list[tuple]:
+    num = lambda col: pd.to_numeric(df_q[col], errors="coerce")
+    extra = num("ActDuration") - num("EstDuration")
+    delta = num("ActPrice") - num("Price")
+    keys = df_q[key_col].astype(object).where(df_q[key_col].notna(), "").astype(str)
+    agg = (
+        pd.DataFrame({"key": keys, "extra": extra, "delta": delta})
+        .groupby("key")
+        .agg(routes=("key", "size"), extra=("extra", "sum"), delta=("delta", "sum"))
+    )
+    return [(k, int(r.routes), float(r.extra), float(r.delta)) for k, r in agg.iterrows()]
+
+def record_week(yearweek: str, df_q: pd.DataFrame) -> None:
+    """
+    Logger en analyseret uge: antal ruter samt aggregater pr. kunde og pr.
+    QuickNotes-kategori (ekstra minutter = ActDuration − EstDuration,
+    prisdelta = ActPrice − Price). Ugens tidligere tal erstattes i én
+    transaktion.
+    """
+    yearweek = str(yearweek)
+    payload = {"count": len(df_q), "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M")}
+    with closing(connect()) as conn, conn:
+        _upsert_counts(conn, {yearweek: payload})
+        for table, key, col in (
+            ("agg_customer_week", "customer", "CustomerName"),
+            ("agg_category_week", "category", "QuickNotesCategory"),
+        ):
+            conn.execute(f"DELETE FROM {table} WHERE yearweek = ?", (yearweek,))
+            conn.executemany(
+                f"INSERT INTO {table} (yearweek, {key}, routes, extra_minutes, price_delta) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(yearweek, *row) for row in _week_aggregates(df_q, col)],
+            )
+
+def read_weekly_aggregates(by: str) -> pd.DataFrame:
+    """
+    Læser de forudberegnede ugetal. `by` er "customer" eller "category";
+    "week" giver totaler pr. uge.
+    """
+    with closing(connect()) as conn:
+        if by == "week":
+            query = (
+                "SELECT c.yearweek AS YearWeek, c.count AS Routes, c.updated_at AS UpdatedAt, "
+                "COALESCE(SUM(a.extra_minutes), 0) AS ExtraMinutes, "
+                "COALESCE(SUM(a.price_delta), 0) AS PriceDelta "
+                "FROM weekly_counts c LEFT JOIN agg_category_week a ON a.yearweek = c.yearweek "
+                "GROUP BY c.yearweek ORDER BY c.yearweek"
+            )
+        elif by in ("customer", "category"):
+            query = (
+                f"SELECT yearweek AS YearWeek, {by} AS {by.capitalize()}, routes AS Routes, "
+                "extra_minutes AS ExtraMinutes, price_delta AS PriceDelta "
+                f"FROM agg_{by}_week ORDER BY yearweek, {by}"
+            )
+        else:
+            raise ValueError(f"Ukendt aggregering: {by}")
+        return pd.read_sql_query(query, conn)
+
+def read_weekly_log() -> dict:
+    """Returnerer historikken i formatet { "YYYYWW": { "count": int, "updated_at": str } }."""
+    with closing(connect()) as conn:
+        rows = conn.execute(
+            "SELECT yearweek, count, updated_at FROM weekly_counts ORDER BY yearweek"
+        ).fetchall()
+    return {yw: {"count": count, "updated_at": updated_at} for yw, count, updated_at in rows}
+
+def import_weekly_log(log: dict) -> None:
+    """Merger en importeret historik ind (importerede uger overskriver eksisterende)."""
+    with closing(connect()) as conn, conn:
+        _upsert_counts(conn, log)
+
+def reset_weekly_log() -> None:
+    """Sletter ugetal, aggregater og ugernes gemte ruter og fingeraftryk."""
+    with closing(connect()) as conn, conn:
+        for table in ("weekly_counts", "agg_customer_week", "agg_category_week"):
+            conn.execute(f"DELETE FROM {table}")
+    for week in stored_weeks():
+        delete_week_routes(week)
+
+def export_weekly_log_json() -> bytes:
+    return json.dumps(read_weekly_log(), ensure_ascii=False, indent=2).encode("utf-8")
+
+# --- Revenue-estimater ------------------------------------------------------
+
+def read_revenue_estimates() -> pd.DataFrame:
+    """Gemte estimater som kolonnerne ID (tekst) og EstPotential."""
+    with closing(connect()) as conn:
+        return pd.read_sql_query(
+            "SELECT customer_id AS ID, est_potential AS EstPotential FROM revenue_estimates",
+            conn,
+        )
+
+def save_revenue_estimates(estimates: pd.DataFrame) -> None:
+    """
+    Gemmer estimater (kolonnerne ID og EstPotential) i én transaktion. Et
+    tomt estimat sletter kundens gemte værdi; rækker uden ID ignoreres.
+    """
+    estimates = estimates[estimates["ID"].notna()]
+    values = pd.to_numeric(estimates["EstPotential"], errors="coerce")
+    ids = estimates["ID"].astype(str)
+    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M")
+    with closing(connect()) as conn, conn:
+        conn.executemany(
+            """
+            INSERT INTO revenue_estimates (customer_id, est_potential, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(customer_id) DO UPDATE SET
+                est_potential = excluded.est_potential,
+                updated_at = excluded.updated_at
+            """,
+            [(i, float(v), updated_at) for i, v in zip(ids[values.notna()], values[values.notna()])],
+        )
+        conn.executemany(
+            "DELETE FROM revenue_estimates WHERE customer_id = ?",
+            [(i,) for i in ids[values.isna()]],
+        )
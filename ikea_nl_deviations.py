@@ -1,30 +1,33 @@
 # ikea_nl_deviations.py
 
 import streamlit as st
-import pandas as pd
-import io
 
-# Indlæs keywords
-try:
-    with open("keywords.txt", "r", encoding="utf-8") as f:
-        all_keywords = [line.strip().lower() for line in f if line.strip()]
-except Exception as e:
-    st.error(f"Fejl ved indlæsning af keywords.txt: {e}")
-    all_keywords = []
-
-def analyse_supportnote(note):
-    if pd.isna(note):
-        return "Nej", ""
-    text = str(note).lower()
-    matched = [kw for kw in all_keywords if kw in text]
-    if matched:
-        matched = list(set(matched))
-        return "Ja", ", ".join(matched)
-    return "Nej", ""
+from export import download_df
+from ikea_nl_pipeline import (
+    IKEA_NL_SCHEMA,
+    OUTPUT_COLUMNS,
+    keyword_stats,
+    load_keywords,
+    run_ikea_nl_pipeline,
+)
+from ingest import UPLOAD_TYPES, read_table, validate_upload
+from perf import instrumented, stage
 
+@instrumented("ikea_nl")
 def ikea_nl_deviations_tab():
+    _, keywords_error = load_keywords()
+    if keywords_error:
+        st.error(keywords_error)
+    else:
+        stats = keyword_stats()
+        duplicates = (
+            f" – {stats['duplicates']} dubletter efter normalisering er slået sammen"
+            if stats["duplicates"] else ""
+        )
+        st.caption(f"{stats['keywords']} keywords i keywords.txt{duplicates}.")
+
     st.write(
-        "Upload en Excel-fil med kolonnerne:\n"
+        "Upload en Excel-, CSV- eller Parquet-fil med kolonnerne:\n"
         "`RouteId`, `DriverId`, `Date`, `Slug`, `ActualStartTime`, "
         "`REVISEDActualStartTime`, `ActualEndTime`, `ActualDuration (min)`, "
         "`REVISEDActualDuration (min)`, `EstimatedStartTime`, `EstimatedEndTime`, "
@@ -33,55 +36,52 @@ def ikea_nl_deviations_tab():
     )
     
     uploaded = st.file_uploader(
-        "Vælg Deviations Excel-fil",
-        type=["xlsx", "xls"],
+        "Vælg Deviations-fil (Excel, CSV eller Parquet)",
+        type=UPLOAD_TYPES + ["xls"],
         key="ikea_dev"
     )
     if not uploaded:
         return
 
+    # Tjek overskrifterne, før hele filen parses
     try:
-        df = pd.read_excel(uploaded, engine="openpyxl")
+        with stage("Tjek af kolonner"):
+            validate_upload(uploaded, IKEA_NL_SCHEMA)
+    except ValueError as e:
+        st.error(str(e))
+        return
     except Exception as e:
         st.error(f"Kunne ikke læse filen: {e}")
         return
 
-    required = [
-        "RouteId", "DriverId", "Date", "Slug", "ActualStartTime",
-        "REVISEDActualStartTime", "ActualEndTime", "ActualDuration (min)",
-        "REVISEDActualDuration (min)", "EstimatedStartTime",
-        "EstimatedEndTime", "EstimateDuration (min)", "Deviation (min)",
-        "Realtime-tag", "SupportNote", "Assessment", "ShortNote"
-    ]
-    missing = [c for c in required if c not in df.columns]
-    if missing:
-        st.error("Manglende kolonner: " + ", ".join(missing))
+    try:
+        with stage("Indlæsning") as s:
+            df = read_table(uploaded, IKEA_NL_SCHEMA)
+            s.output(df)
+    except Exception as e:
+        st.error(f"Kunne ikke læse filen: {e}")
         return
 
-    # Drop rækker uden SupportNote
-    df = df.dropna(subset=["SupportNote"])
+    try:
+        with stage("Keyword-analyse") as s:
+            s.input(df)
+            df = run_ikea_nl_pipeline(df)
+            s.output(df)
+    except ValueError as e:
+        st.error(str(e))
+        return
     if df.empty:
         st.error("Ingen rækker med SupportNote fundet.")
         return
 
-    # Keyword-analyse
-    df["Keywords"] = df["SupportNote"].apply(lambda n: analyse_supportnote(n)[0])
-    df["MatchingKeyword"] = df["SupportNote"].apply(lambda n: analyse_supportnote(n)[1])
-
-    # Formatér dato
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.strftime("%d-%m-%Y")
-
-    cols_out = required + ["Keywords", "MatchingKeyword"]
-    st.dataframe(df[cols_out])
+    with stage("Tabel"):
+        st.dataframe(df[OUTPUT_COLUMNS])
 
     # Download af analyseret Deviations-rapport
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="IKEA_NL_Deviations")
-    buf.seek(0)
-    st.download_button(
-        "Download analyseret Deviations",
-        data=buf,
-        file_name="ikea_nl_deviations.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    with stage("Download-knapper"):
+        download_df(
+            df,
+            "Download analyseret Deviations",
+            "ikea_nl_deviations.xlsx",
+            sheet_name="IKEA_NL_Deviations",
+        )
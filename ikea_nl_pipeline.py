@@ -0,0 +1,95 @@
+# ikea_nl_pipeline.py
+
+import os
+
+import pandas as pd
+
+from ingest import TableSchema
+from keyword_index import keyword_index
+from matching import KeywordMatcher
+
+KEYWORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keywords.txt")
+
+# --- Keywords ---------------------------------------------------------------
+
+def load_keywords() -> tuple[list[str], str | None]:
+    """
+    Keywords fra keywords.txt efter normalisering og deduplikering.
+    Returnerer (keywords, fejlbesked); fejlbeskeden er None, hvis filen
+    kunne læses. Filen læses kun igen, når den er ændret.
+    """
+    index = keyword_index(KEYWORDS_PATH)
+    return index.keywords(), index.error()
+
+def keyword_stats() -> dict:
+    """Antal linjer i keywords.txt, keywords efter normalisering og dubletter."""
+    return keyword_index(KEYWORDS_PATH).stats()
+
+def keyword_matcher() -> KeywordMatcher:
+    """Den kompilerede matcher – bygges igen, når keywords.txt ændres."""
+    return keyword_index(KEYWORDS_PATH).matcher()
+
+REQUIRED_COLUMNS = [
+    "RouteId", "DriverId", "Date", "Slug", "ActualStartTime",
+    "REVISEDActualStartTime", "ActualEndTime", "ActualDuration (min)",
+    "REVISEDActualDuration (min)", "EstimatedStartTime",
+    "EstimatedEndTime", "EstimateDuration (min)", "Deviation (min)",
+    "Realtime-tag", "SupportNote", "Assessment", "ShortNote"
+]
+
+IKEA_NL_SCHEMA = TableSchema(
+    columns=tuple(REQUIRED_COLUMNS),
+    numeric=(
+        "ActualDuration (min)", "REVISEDActualDuration (min)",
+        "EstimateDuration (min)", "Deviation (min)",
+    ),
+    dates=("Date",),
+    required=tuple(REQUIRED_COLUMNS),
+)
+
+OUTPUT_COLUMNS = REQUIRED_COLUMNS + ["Keywords", "MatchingKeyword"]
+
+def analyse_supportnote(note):
+    if pd.isna(note):
+        return "Nej", ""
+    matched = keyword_matcher().find(str(note))
+    if matched:
+        return "Ja", ", ".join(matched)
+    return "Nej", ""
+
+def analyse_supportnotes(notes: pd.Series) -> pd.DataFrame:
+    """
+    Vektoriseret udgave af `analyse_supportnote`: ét gennemløb over hele
+    SupportNote-kolonnen giver både Ja/Nej-flag og de matchende keywords.
+    """
+    hits = keyword_matcher().match_series(notes)
+    has_hit = hits.map(bool)
+    return pd.DataFrame(
+        {
+            "Keywords": has_hit.map({True: "Ja", False: "Nej"}),
+            "MatchingKeyword": hits.map(", ".join),
+        },
+        index=notes.index,
+    )
+
+def run_ikea_nl_pipeline(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keyword-analyse af en IKEA NL Deviations-rapport. Rejser ValueError ved
+    manglende kolonner; returnerer en tom DataFrame hvis ingen rækker har
+    en SupportNote.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError("Manglende kolonner: " + ", ".join(missing))
+
+    # Drop rækker uden SupportNote
+    df = df.dropna(subset=["SupportNote"])
+    if df.empty:
+        return df
+
+    # Keyword-analyse
+    df[["Keywords", "MatchingKeyword"]] = analyse_supportnotes(df["SupportNote"])
+
+    # Formatér dato
+    df["Date"] = df["Date"].dt.strftime("%d-%m-%Y")
+    return df
@@ -0,0 +1,361 @@
+# ingest.py
+
+import difflib
+import hashlib
+import io
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+try:
+    import python_calamine  # noqa: F401  (Rust-baseret xlsx-læser, markant hurtigere)
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+try:
+    import pyarrow  # noqa: F401  (flertrådet CSV-læser og Parquet-understøttelse)
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Filtyper der kan uploades i fanebladene (".csv.gz" har endelsen "gz")
+UPLOAD_TYPES = ["xlsx", "csv", "gz", "parquet"]
+# Filendelser der genkendes ved indlæsning fra en mappe
+FILE_SUFFIXES = (".xlsx", ".csv", ".csv.gz", ".parquet")
+
+# Samlet øvre grænse for de parsede DataFrames, der holdes i cachen
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# --- Skema -----------------------------------------------------------------
+
+@dataclass(frozen=True)
+class TableSchema:
+    """
+    Beskriver hvilke kolonner et faneblad skal bruge, og hvilke typer de
+    skal have. Kun disse kolonner læses ind; resten springes over allerede
+    i parseren.
+    """
+    columns: tuple[str, ...] = ()
+    numeric: tuple[str, ...] = ()
+    categorical: tuple[str, ...] = ()
+    dates: tuple[str, ...] = ()
+    # Ekstra kolonner der matcher dette regex læses med og gøres numeriske
+    numeric_pattern: str | None = None
+    # 0-baseret række med kolonneoverskrifter
+    header: int = 0
+    # Kolonner der skal findes i filen – tjekkes ud fra overskriften alene
+    required: tuple[str, ...] = ()
+
+    def wants(self, column) -> bool:
+        name = str(column).strip()
+        if name in self.columns:
+            return True
+        return bool(self.numeric_pattern and re.fullmatch(self.numeric_pattern, name))
+
+    def apply_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Anvender dtype-planen på en netop indlæst DataFrame."""
+        numeric = list(self.numeric)
+        if self.numeric_pattern:
+            numeric += [c for c in df.columns if re.fullmatch(self.numeric_pattern, c)]
+        for col in numeric:
+            if col in df.columns:
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        for col in self.dates:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors="coerce")
+        for col in self.categorical:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+        return df
+
+# --- Parse-cache ------------------------------------------------------------
+
+class _ParseCache:
+    """
+    Proces-dækkende LRU-cache over parsede uploads, nøglet på et hash af
+    filens bytes (plus læseparametre). Deles af alle sessioner og faneblade.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[pd.DataFrame, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> pd.DataFrame | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: tuple, df: pd.DataFrame) -> None:
+        nbytes = int(df.memory_usage(deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (df, nbytes)
+            self._size += nbytes
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_cache = _ParseCache(MAX_CACHE_BYTES)
+
+# --- Hjælpefunktioner -------------------------------------------------------
+
+def upload_bytes(uploaded) -> bytes:
+    """Returnerer hele indholdet af en uploadet fil (UploadedFile eller sti)."""
+    if isinstance(uploaded, bytes):
+        return uploaded
+    if isinstance(uploaded, str):
+        with open(uploaded, "rb") as f:
+            return f.read()
+    if hasattr(uploaded, "getvalue"):
+        return uploaded.getvalue()
+    uploaded.seek(0)
+    return uploaded.read()
+
+def upload_format(uploaded) -> str:
+    """
+    Bestemmer filformatet ud fra filnavnet: 'excel', 'csv', 'csv.gz' eller
+    'parquet'. Rejser ValueError for andre gzip-filer (fx .xlsx.gz), som
+    uploaderen lukker igennem, fordi den kun kan filtrere på "gz".
+    """
+    name = uploaded if isinstance(uploaded, str) else getattr(uploaded, "name", "")
+    name = name.lower()
+    if name.endswith(".csv.gz"):
+        return "csv.gz"
+    if name.endswith(".gz"):
+        raise ValueError(
+            f"'{os.path.basename(name)}' kan ikke læses: kun CSV-filer kan uploades gzippet (.csv.gz)"
+        )
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(".parquet"):
+        return "parquet"
+    return "excel"
+
+def list_input_files(directory: str) -> list[str]:
+    """Alle understøttede filer i en mappe (ikke rekursivt), sorteret efter navn."""
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(FILE_SUFFIXES)
+    )
+
+def content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+def frame_hash(df: pd.DataFrame) -> str:
+    """Stabilt hash af en DataFrames indhold (værdier, index og kolonnenavne)."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr(list(df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _projects(schema: TableSchema) -> bool:
+    return bool(schema.columns or schema.numeric_pattern)
+
+def _parse_excel(data: bytes, schema: TableSchema) -> pd.DataFrame:
+    df = pd.read_excel(
+        io.BytesIO(data),
+        engine=EXCEL_ENGINE,
+        header=schema.header,
+        usecols=schema.wants if _projects(schema) else None,
+    )
+    df.columns = [str(c).strip() for c in df.columns]
+    return schema.apply_dtypes(df)
+
+def _parse_csv(data: bytes, schema: TableSchema, compression: str | None) -> pd.DataFrame:
+    # Læs kun overskriften først, så de ønskede kolonner kan gives som liste
+    header = pd.read_csv(
+        io.BytesIO(data), compression=compression, header=schema.header, nrows=0
+    ).columns
+    usecols = [c for c in header if schema.wants(c)] if _projects(schema) else None
+    df = pd.read_csv(
+        io.BytesIO(data),
+        engine=CSV_ENGINE,
+        compression=compression,
+        header=schema.header,
+        usecols=usecols,
+    )
+    df.columns = [str(c).strip() for c in df.columns]
+    return schema.apply_dtypes(df)
+
+def _parse_parquet(data: bytes, schema: TableSchema) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+
+    source = pq.ParquetFile(io.BytesIO(data))
+    names = source.schema_arrow.names
+    columns = [c for c in names if schema.wants(c)] if _projects(schema) else None
+    df = source.read(columns=columns).to_pandas()
+    df.columns = [str(c).strip() for c in df.columns]
+    return schema.apply_dtypes(df)
+
+def parse_table(data: bytes, fmt: str, schema: TableSchema) -> pd.DataFrame:
+    """Parser filindhold i formatet `fmt` (se `upload_format`) uden om cachen."""
+    if fmt == "csv":
+        return _parse_csv(data, schema, compression=None)
+    if fmt == "csv.gz":
+        return _parse_csv(data, schema, compression="gzip")
+    if fmt == "parquet":
+        return _parse_parquet(data, schema)
+    return _parse_excel(data, schema)
+
+# --- Tjek af overskrifter ---------------------------------------------------
+
+def parse_header(data: bytes, fmt: str, schema: TableSchema) -> list[str]:
+    """Læser kun overskriftsrækken (række `schema.header`) – ingen data."""
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        columns = pq.ParquetFile(io.BytesIO(data)).schema_arrow.names
+    elif fmt in ("csv", "csv.gz"):
+        columns = pd.read_csv(
+            io.BytesIO(data),
+            compression="gzip" if fmt == "csv.gz" else None,
+            header=schema.header,
+            nrows=0,
+        ).columns
+    else:
+        # openpyxl streamer rækkerne i en xlsx (en zip-fil) og stopper efter
+        # overskriften; calamine indlæser hele arket, selv når der ikke bedes
+        # om data. Andre Excel-formater (fx .xls) læses med EXCEL_ENGINE.
+        engine = "openpyxl" if data[:4] == b"PK\x03\x04" else EXCEL_ENGINE
+        columns = pd.read_excel(
+            io.BytesIO(data), engine=engine, header=schema.header, nrows=0
+        ).columns
+    return [str(c).strip() for c in columns]
+
+def header_problems(header: list[str], schema: TableSchema) -> list[str]:
+    """
+    Beskriver hver manglende påkrævet kolonne – med et forslag, hvis en
+    kolonne i filen ligner (fx omdøbt eller stavet anderledes).
+    """
+    present = set(header)
+    candidates = {c.lower(): c for c in header if c not in schema.required}
+    problems = []
+    for col in schema.required:
+        if col in present:
+            continue
+        close = difflib.get_close_matches(col.lower(), list(candidates), n=1, cutoff=0.6)
+        problems.append(f"'{col}' (mente du '{candidates[close[0]]}'?)" if close else f"'{col}'")
+    if schema.numeric_pattern and not any(re.fullmatch(schema.numeric_pattern, c) for c in header):
+        problems.append("årskolonner (fx '2024' eller 'YTD 2025')")
+    return problems
+
+_FORMAT_NAMES = {"excel": "Excel", "csv": "CSV", "csv.gz": "gzippet CSV", "parquet": "Parquet"}
+
+def check_header(data: bytes, fmt: str, schema: TableSchema) -> None:
+    """
+    Rejser ValueError, hvis filen mangler påkrævede kolonner – før den
+    parses. En fil, der slet ikke kan læses i formatet (fx en PDF med
+    endelsen .xlsx), giver også ValueError, så fanerne viser én fejlbesked.
+    """
+    try:
+        header = parse_header(data, fmt, schema)
+    except Exception as e:
+        raise ValueError(f"Filen kunne ikke læses som {_FORMAT_NAMES.get(fmt, fmt)} ({e})") from e
+    _raise_problems(header_problems(header, schema), schema)
+
+def _raise_problems(problems: list[str], schema: TableSchema) -> None:
+    if problems:
+        row = f" (overskrifter i række {schema.header + 1})" if schema.header else ""
+        raise ValueError(f"Filen mangler kolonner{row}: " + ", ".join(problems))
+
+def validate_upload(uploaded, schema: TableSchema) -> None:
+    """
+    Som `check_header` for en uploadet fil. Springes over, hvis filen
+    allerede ligger parset i cachen.
+    """
+    data = upload_bytes(uploaded)
+    fmt = upload_format(uploaded)
+    cached = _cache.get((content_hash(data), fmt, schema))
+    if cached is not None:
+        _raise_problems(header_problems(list(cached.columns), schema), schema)
+        return
+    check_header(data, fmt, schema)
+
+# --- Læsning i bidder --------------------------------------------------------
+
+# Standardstørrelse for bidder ved streaming af store filer
+CHUNK_ROWS = 200_000
+
+def _chunk_source(uploaded):
+    # Stier læses direkte fra disk; uploads ligger allerede i hukommelsen som bytes
+    return uploaded if isinstance(uploaded, str) else io.BytesIO(upload_bytes(uploaded))
+
+def iter_table_chunks(uploaded, schema: TableSchema, chunk_rows: int = CHUNK_ROWS):
+    """
+    Læser en fil i bidder af højst `chunk_rows` rækker efter skemaet, så
+    kun én bid ad gangen er en DataFrame i hukommelsen. CSV og Parquet
+    streames; xlsx kan ikke læses i bidder og parses derfor helt først.
+    Går uden om parse-cachen.
+    """
+    fmt = upload_format(uploaded)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        source = pq.ParquetFile(_chunk_source(uploaded))
+        names = source.schema_arrow.names
+        columns = [c for c in names if schema.wants(c)] if _projects(schema) else None
+        for batch in source.iter_batches(batch_size=chunk_rows, columns=columns):
+            df = batch.to_pandas()
+            df.columns = [str(c).strip() for c in df.columns]
+            yield schema.apply_dtypes(df)
+        return
+
+    if fmt in ("csv", "csv.gz"):
+        compression = "gzip" if fmt == "csv.gz" else None
+        source = _chunk_source(uploaded)
+        header = pd.read_csv(source, compression=compression, header=schema.header, nrows=0).columns
+        if not isinstance(source, str):
+            source.seek(0)
+        usecols = [c for c in header if schema.wants(c)] if _projects(schema) else None
+        # pyarrow-motoren understøtter ikke chunksize
+        with pd.read_csv(
+            source,
+            compression=compression,
+            header=schema.header,
+            usecols=usecols,
+            chunksize=chunk_rows,
+        ) as reader:
+            for df in reader:
+                df.columns = [str(c).strip() for c in df.columns]
+                yield schema.apply_dtypes(df)
+        return
+
+    df = _parse_excel(upload_bytes(uploaded), schema)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+def read_table(uploaded, schema: TableSchema) -> pd.DataFrame:
+    """
+    Læser en uploadet fil (xlsx, csv, csv.gz eller parquet) efter
+    fanebladets skema: kun de nødvendige kolonner, med de deklarerede typer.
+    Filen parses kun første gang et givent indhold ses; efterfølgende reruns
+    (fx når et filter ændres) får en kopi af den cachede DataFrame.
+    """
+    data = upload_bytes(uploaded)
+    fmt = upload_format(uploaded)
+    key = (content_hash(data), fmt, schema)
+    df = _cache.get(key)
+    if df is None:
+        df = parse_table(data, fmt, schema)
+        _cache.put(key, df)
+    return df.copy()
@@ -0,0 +1,88 @@
+# keyword_index.py
+
+import os
+import threading
+
+from matching import KeywordMatcher, normalize_text
+
+# --- Keyword-indeks ---------------------------------------------------------
+
+class KeywordIndex:
+    """
+    Proces-dækkende indeks over en keyword-fil. Filen læses, normaliseres
+    (små bogstaver, diakritiske tegn, whitespace) og dedupliceres, og
+    matcheren kompileres én gang. Ved hvert opslag tjekkes kun filens
+    mtime og størrelse; ændres filen, bygges indekset igen, så rettelser
+    slår igennem uden genstart af appen.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._matcher = KeywordMatcher([], normalize=normalize_text)
+        self._raw_count = 0
+        self._error: str | None = None
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _rebuild(self, stamp) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = [line.strip() for line in f if line.strip()]
+            self._error = None
+        except Exception as e:
+            lines = []
+            self._error = f"Fejl ved indlæsning af {os.path.basename(self.path)}: {e}"
+        self._matcher = KeywordMatcher(lines, normalize=normalize_text)
+        self._raw_count = len(lines)
+        self._stamp = stamp
+
+    def _current(self) -> None:
+        stamp = self._file_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp is None or stamp != self._stamp:
+                self._rebuild(stamp)
+
+    def matcher(self) -> KeywordMatcher:
+        """Den kompilerede matcher for filens nuværende indhold."""
+        self._current()
+        return self._matcher
+
+    def keywords(self) -> list[str]:
+        """Keywords efter deduplikering, med den første stavemåde fra filen."""
+        matcher = self.matcher()
+        return [matcher.labels[t] for t in matcher.terms]
+
+    def error(self) -> str | None:
+        self._current()
+        return self._error
+
+    def stats(self) -> dict:
+        """Antal linjer i filen og antal keywords efter normalisering og deduplikering."""
+        matcher = self.matcher()
+        return {
+            "lines": self._raw_count,
+            "keywords": len(matcher.terms),
+            "duplicates": self._raw_count - len(matcher.terms),
+        }
+
+
+_indexes: dict[str, KeywordIndex] = {}
+_indexes_lock = threading.Lock()
+
+def keyword_index(path: str) -> KeywordIndex:
+    """Det fælles indeks for `path` – ét pr. fil og proces."""
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = KeywordIndex(path)
+    return index
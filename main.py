@@ -1,19 +1,30 @@
 # main.py
 
+import importlib
+
 import streamlit as st
 
 # --- Helpers ---------------------------------------------------------------
 
-def load_css(path: str = "styles.css") -> None:
+@st.cache_resource
+def _read_css(path: str) -> str | None:
     try:
         with open(path, "r", encoding="utf-8") as f:
-            st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+            return f.read()
     except FileNotFoundError:
+        return None
+
+def load_css(path: str = "styles.css") -> None:
+    css = _read_css(path)
+    if css is None:
         st.warning(f"Kunne ikke finde {path}. Læg styles.css i samme mappe som main.py")
+        return
+    st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
 
-def svg_icon(name: str) -> str:
+@st.cache_resource
+def _icons() -> dict[str, str]:
     # Simple, clean SVGs (24x24) using currentColor
-    icons = {
+    return {
         "insights": """
         <svg class="card-icon" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
           <path d="M4 19V5" stroke="currentColor" stroke-width="2" stroke-linecap="round"/>
@@ -32,6 +43,12 @@ def svg_icon(name: str) -> str:
                 stroke="currentColor" stroke-width="2" />
         </svg>
         """,
+        "leaf": """
+        <svg class="card-icon" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
+          <path d="M5 19C5 11 10 5 20 4C19 14 13 19 5 19Z" stroke="currentColor" stroke-width="2" stroke-linejoin="round"/>
+          <path d="M5 19L13 11" stroke="currentColor" stroke-width="2" stroke-linecap="round"/>
+        </svg>
+        """,
         "note": """
         <svg class="card-icon" viewBox="0 0 24 24" fill="none" xmlns="http://www.w3.org/2000/svg">
           <path d="M7 3H15L19 7V21H7V3Z" stroke="currentColor" stroke-width="2" stroke-linejoin="round"/>
@@ -41,7 +58,9 @@ def svg_icon(name: str) -> str:
         </svg>
         """
     }
-    return icons.get(name, "")
+
+def svg_icon(name: str) -> str:
+    return _icons().get(name, "")
 
 def card(title: str, body: str, icon_svg: str) -> None:
     st.markdown(
@@ -103,11 +122,52 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# --- Import pages -----------------------------------------------------------
-
-from controlling import controlling_tab
-from solar_weekly import solar_weekly_tab
-from overviewnotes import overviewnotes_tab
+# --- Pages ------------------------------------------------------------------
+
+# Hver side importeres først, når den åbnes, så login og dashboard ikke
+# betaler for pandas-tunge moduler.
+PAGES = {
+    "controlling": {
+        "module": "controlling",
+        "function": "controlling_tab",
+        "title": "Controlling Report Analyzer",
+        "body": "Overblik over ruter med ekstra tid og kundedeviation baseret på QuickNotes.",
+        "icon": "insights",
+        "button": "Åbn Controlling",
+        "key": "controlling",
+    },
+    "solar_weekly": {
+        "module": "solar_weekly",
+        "function": "solar_weekly_tab",
+        "title": "Solar Weekly Report",
+        "body": "Upload ugens Solar-rapport og få et hurtigt overblik over performance og nøgletal.",
+        "icon": "calendar",
+        "button": "Åbn Solar Weekly",
+        "key": "solar",
+    },
+    "solar_co2": {
+        "module": "solar_co2",
+        "function": "solar_co2_tab",
+        "title": "Solar CO2 Report",
+        "body": "Beregn CO2 pr. rute, køretøjstype og uge ud fra Solars RouteStat-data.",
+        "icon": "leaf",
+        "button": "Åbn Solar CO2",
+        "key": "solar_co2",
+    },
+    "overviewnotes": {
+        "module": "overviewnotes",
+        "function": "overviewnotes_tab",
+        "title": "Overblik &amp; noter",
+        "body": "Skriv noter, instrukser og hjælpeartikler til teamet. Kan eksporteres/importeres som JSON.",
+        "icon": "note",
+        "button": "Åbn Overblik & noter",
+        "key": "overviewnotes",
+    },
+}
+
+def page_function(page_key: str):
+    page = PAGES[page_key]
+    return getattr(importlib.import_module(page["module"]), page["function"])
 
 # --- Router ----------------------------------------------------------------
 
@@ -120,7 +180,19 @@ def go(page_key: str):
 
 # --- Views -----------------------------------------------------------------
 
-if st.session_state.page == "dashboard":
+if st.session_state.page in PAGES:
+    page_key = st.session_state.page
+    col_back, _ = st.columns([1, 4])
+    with col_back:
+        st.markdown('<div class="secondary-btn">', unsafe_allow_html=True)
+        if st.button("← Tilbage til dashboard", key=f"back_from_{PAGES[page_key]['key']}"):
+            go("dashboard")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    st.markdown("---")
+    page_function(page_key)()
+
+else:
     st.markdown("### Dashboard")
     st.markdown(
         """
@@ -133,68 +205,13 @@ if st.session_state.page == "dashboard":
 
     st.markdown('<div class="dashboard-grid">', unsafe_allow_html=True)
 
-    # 1) Controlling
-    card(
-        "Controlling Report Analyzer",
-        "Overblik over ruter med ekstra tid og kundedeviation baseret på QuickNotes.",
-        svg_icon("insights"),
-    )
-    if st.button("Åbn Controlling", key="open_controlling"):
-        go("controlling")
-
-    # 2) Solar Weekly
-    card(
-        "Solar Weekly Report",
-        "Upload ugens Solar-rapport og få et hurtigt overblik over performance og nøgletal.",
-        svg_icon("calendar"),
-    )
-    if st.button("Åbn Solar Weekly", key="open_solar_weekly"):
-        go("solar_weekly")
-
-    # 3) Overblik & noter
-    card(
-        "Overblik &amp; noter",
-        "Skriv noter, instrukser og hjælpeartikler til teamet. Kan eksporteres/importeres som JSON.",
-        svg_icon("note"),
-    )
-    if st.button("Åbn Overblik & noter", key="open_overviewnotes"):
-        go("overviewnotes")
+    for page_key, page in PAGES.items():
+        card(page["title"], page["body"], svg_icon(page["icon"]))
+        if st.button(page["button"], key=f"open_{page_key}"):
+            go(page_key)
 
     st.markdown("</div>", unsafe_allow_html=True)
 
-elif st.session_state.page == "controlling":
-    col_back, _ = st.columns([1, 4])
-    with col_back:
-        st.markdown('<div class="secondary-btn">', unsafe_allow_html=True)
-        if st.button("← Tilbage til dashboard", key="back_from_controlling"):
-            go("dashboard")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    st.markdown("---")
-    controlling_tab()
-
-elif st.session_state.page == "solar_weekly":
-    col_back, _ = st.columns([1, 4])
-    with col_back:
-        st.markdown('<div class="secondary-btn">', unsafe_allow_html=True)
-        if st.button("← Tilbage til dashboard", key="back_from_solar"):
-            go("dashboard")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    st.markdown("---")
-    solar_weekly_tab()
-
-elif st.session_state.page == "overviewnotes":
-    col_back, _ = st.columns([1, 4])
-    with col_back:
-        st.markdown('<div class="secondary-btn">', unsafe_allow_html=True)
-        if st.button("← Tilbage til dashboard", key="back_from_overviewnotes"):
-            go("dashboard")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    st.markdown("---")
-    overviewnotes_tab()
-
 # --- Footer -----------------------------------------------------------------
 
 st.markdown(
@@ -0,0 +1,162 @@
+# matching.py
+
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import pandas as pd
+
+_WHITESPACE = re.compile(r"\s+")
+# Kombinerende diakritiske tegn (accenter o.l.) efter NFKD-opsplitning
+_COMBINING = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+# Danske bogstaver er selvstændige bogstaver, ikke accenter: "låst" er ikke "last"
+_KEEP = frozenset("æøå")
+# Antal noter pr. matcher hvis resultat huskes i hukommelsen
+MAX_MEMO = 200_000
+
+# --- Hjælpefunktioner -------------------------------------------------------
+
+def _trie_regex(terms: list[str]) -> str:
+    """
+    Bygger et regex-udtryk ud fra et trie over alle termer, så motoren kun
+    følger én gren pr. tegn i stedet for at prøve hver term for sig.
+    """
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def _node_to_regex(node: dict) -> str:
+        is_end = "" in node
+        branches = [re.escape(ch) + _node_to_regex(child)
+                    for ch, child in sorted(node.items()) if ch != ""]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        # Grådig: længste match vælges først, slutning af en term er fallback
+        return body + "?" if is_end else body
+
+    return _node_to_regex(trie)
+
+
+class _Fold(dict):
+    """Tegntabel til str.translate, der fylder sig selv ved første opslag."""
+
+    def __missing__(self, codepoint: int) -> str:
+        ch = chr(codepoint)
+        folded = ch if ch in _KEEP else _COMBINING.sub("", unicodedata.normalize("NFKD", ch))
+        self[codepoint] = folded
+        return folded
+
+_FOLD = _Fold()
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliserer tekst til matching: små bogstaver, uden accenter (é → e,
+    ü → u) men med æ, ø og å bevaret, og med al whitespace samlet til ét
+    mellemrum.
+    """
+    text = text.casefold()
+    if not text.isascii():
+        # NFC først, så et å skrevet som a + ring også bevares
+        text = unicodedata.normalize("NFC", text).translate(_FOLD)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class KeywordMatcher:
+    """
+    Kompileret multi-mønster matcher.
+
+    Alle termer samles i ét regex (bygget som et trie), som med et lookahead
+    finder det længste match på hver position i teksten. Kortere termer, der
+    er indeholdt i et fundet match, tilføjes bagefter via en forudberegnet
+    tabel, så resultatet svarer præcis til `kw in text` for hver term.
+
+    Med `normalize` (fx `normalize_text`) normaliseres både termer og tekst
+    med samme funktion; termer der bliver ens, slås sammen, og `find`
+    returnerer den første stavemåde fra listen.
+
+    Resultater huskes pr. tekst i hukommelsen (højst MAX_MEMO noter), så
+    noter der går igen på tværs af reruns og uploads ikke scannes igen.
+    """
+
+    def __init__(self, terms: list[str], normalize=None):
+        self.normalize = normalize or str.lower
+        # Bevar rækkefølgen, men fjern dubletter og tomme linjer
+        labels: dict[str, str] = {}
+        for term in terms:
+            pattern = self.normalize(term) if term else ""
+            if pattern and pattern not in labels:
+                labels[pattern] = term.strip() if normalize else pattern
+        self.terms = list(labels)
+        self.labels = labels
+        self._order = {t: i for i, t in enumerate(self.terms)}
+        self._contained = {
+            t: tuple(o for o in self.terms if o in t) for t in self.terms
+        }
+        self._regex = (
+            re.compile("(?=(" + _trie_regex(self.terms) + "))")
+            if self.terms else None
+        )
+        self._memo: OrderedDict[str, tuple[str, ...]] = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def _scan(self, normalized: str) -> tuple[str, ...]:
+        found = set()
+        for hit in self._regex.findall(normalized):
+            found.update(self._contained[hit])
+        return tuple(self.labels[t] for t in sorted(found, key=self._order.__getitem__))
+
+    def _remember(self, results: dict[str, tuple[str, ...]]) -> None:
+        with self._memo_lock:
+            self._memo.update(results)
+            while len(self._memo) > MAX_MEMO:
+                self._memo.popitem(last=False)
+
+    def find_many(self, texts: list[str]) -> list[tuple[str, ...]]:
+        """
+        Matcher en liste af tekster. Kun tekster, der ikke allerede er i
+        hukommelsen, normaliseres og scannes.
+        """
+        if self._regex is None:
+            return [()] * len(texts)
+        with self._memo_lock:
+            results = [self._memo.get(t) for t in texts]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if not missing:
+            return results
+
+        for i in missing:
+            results[i] = self._scan(self.normalize(texts[i]))
+        self._remember({texts[i]: results[i] for i in missing})
+        return results
+
+    def clear_memo(self) -> None:
+        """Glemmer de huskede resultater (fx så en benchmark måler en kold scanning)."""
+        with self._memo_lock:
+            self._memo.clear()
+
+    def find(self, text: str) -> tuple[str, ...]:
+        """Returnerer alle termer der forekommer i `text` (i fil-rækkefølge)."""
+        if self._regex is None or not text:
+            return ()
+        return self.find_many([text])[0]
+
+    def match_series(self, series: pd.Series) -> pd.Series:
+        """
+        Matcher en hel kolonne. Hver unik tekst slås kun op én gang, og
+        resultatet mappes tilbage til alle rækker.
+        """
+        text = series.fillna("").astype(str)
+        codes, uniques = pd.factorize(text)
+        hits = self.find_many(list(uniques))
+        return pd.Series(
+            [hits[c] for c in codes] if len(codes) else [],
+            index=series.index,
+            dtype=object,
+        )
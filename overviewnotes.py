@@ -1,95 +1,125 @@
 # overviewnotes.py
 
 import json
-import os
-from datetime import datetime
 import pandas as pd
 import streamlit as st
 
-LOG_PATH = "data/controlling_weekly_log.json"
+from history_store import (
+    export_weekly_log_json,
+    import_weekly_log,
+    read_weekly_aggregates,
+    reset_weekly_log,
+)
 
-
-def _ensure_log_dir():
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-
-
-def read_weekly_log() -> dict:
-    _ensure_log_dir()
-    if not os.path.exists(LOG_PATH):
-        return {}
-    try:
-        with open(LOG_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict):
-            return data
-        return {}
-    except Exception:
-        return {}
-
-
-def write_weekly_log(data: dict) -> None:
-    _ensure_log_dir()
-    tmp_path = LOG_PATH + ".tmp"
-    with open(tmp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    os.replace(tmp_path, LOG_PATH)
+# Antal uger i de rullende gennemsnit
+ROLLING_WEEKS = 4
 
 
 def overviewnotes_tab():
     st.header("Overblik – Controlling dashboard")
     st.caption("Automatisk log af antal ruter der skal kontrolleres (ugentligt).")
 
-    log = read_weekly_log()
+    weekly = read_weekly_aggregates("week")
 
-    if not log:
+    if weekly.empty:
         st.info(
             "Der er endnu ingen historik. Kør en Controlling-analyse (upload fil), "
             "så logges uge og antal ruter automatisk."
         )
         return
 
-    # log format: { "YYYYWW": { "count": int, "updated_at": str } }
-    rows = []
-    for yearweek, payload in log.items():
-        if isinstance(payload, dict):
-            rows.append(
-                {
-                    "YearWeek": yearweek,
-                    "Count": int(payload.get("count", 0)),
-                    "UpdatedAt": payload.get("updated_at", ""),
-                }
-            )
-
-    df = pd.DataFrame(rows).sort_values("YearWeek")
+    # Rullende gennemsnit og ændring uge-til-uge på de forudberegnede ugetal
+    for col in ("Routes", "ExtraMinutes", "PriceDelta"):
+        weekly[f"{col}Rolling"] = weekly[col].rolling(ROLLING_WEEKS, min_periods=1).mean()
+        weekly[f"{col}WoW"] = weekly[col].diff()
 
     # Metrics
-    latest = df.iloc[-1]
-    total_weeks = df["YearWeek"].nunique()
-    total_routes = int(df["Count"].sum())
-    avg_per_week = float(df["Count"].mean()) if len(df) else 0.0
+    latest = weekly.iloc[-1]
+    total_weeks = weekly["YearWeek"].nunique()
+    avg_per_week = float(weekly["Routes"].mean())
+
+    def _delta(value):
+        return None if pd.isna(value) else f"{value:+,.0f}"
 
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Seneste uge", latest["YearWeek"])
-    c2.metric("Ruter (seneste uge)", int(latest["Count"]))
+    c2.metric("Ruter (seneste uge)", int(latest["Routes"]), delta=_delta(latest["RoutesWoW"]),
+              delta_color="inverse")
     c3.metric("Gns. pr. uge", f"{avg_per_week:.1f}")
     c4.metric("Uger logget", int(total_weeks))
 
+    c5, c6, _, _ = st.columns(4)
+    c5.metric("Ekstra minutter (seneste uge)", f"{latest['ExtraMinutes']:,.0f}",
+              delta=_delta(latest["ExtraMinutesWoW"]), delta_color="inverse")
+    c6.metric("Prisdelta (seneste uge)", f"{latest['PriceDelta']:,.0f} kr.",
+              delta=_delta(latest["PriceDeltaWoW"]), delta_color="inverse")
+
     st.markdown("---")
 
-    # Chart
+    # Charts
+    by_week = weekly.set_index("YearWeek")
+    rolling_label = f"Rullende gns. ({ROLLING_WEEKS} uger)"
+
     st.subheader("Antal ruter der skal kontrolleres pr. uge")
-    chart_df = df.set_index("YearWeek")[["Count"]]
-    st.bar_chart(chart_df)
+    st.line_chart(
+        by_week[["Routes", "RoutesRolling"]].rename(
+            columns={"Routes": "Ruter", "RoutesRolling": rolling_label}
+        )
+    )
+
+    col_min, col_price = st.columns(2)
+    with col_min:
+        st.subheader("Ekstra minutter pr. uge")
+        st.caption("Sum af ActDuration − EstDuration for ugens ruter.")
+        st.line_chart(
+            by_week[["ExtraMinutes", "ExtraMinutesRolling"]].rename(
+                columns={"ExtraMinutes": "Ekstra minutter", "ExtraMinutesRolling": rolling_label}
+            )
+        )
+    with col_price:
+        st.subheader("Prisdelta pr. uge")
+        st.caption("Sum af ActPrice − Price for ugens ruter.")
+        st.line_chart(
+            by_week[["PriceDelta", "PriceDeltaRolling"]].rename(
+                columns={"PriceDelta": "Prisdelta", "PriceDeltaRolling": rolling_label}
+            )
+        )
+
+    categories = read_weekly_aggregates("category")
+    if not categories.empty:
+        st.subheader("Ruter pr. QuickNotes-kategori")
+        st.bar_chart(
+            categories.pivot(index="YearWeek", columns="Category", values="Routes").fillna(0)
+        )
+
+    customers = read_weekly_aggregates("customer")
+    if not customers.empty:
+        st.subheader(f"Kunder i uge {latest['YearWeek']}")
+        weeks = sorted(customers["YearWeek"].unique())
+        prev_week = weeks[-2] if len(weeks) > 1 else None
+        current = customers[customers["YearWeek"] == latest["YearWeek"]].set_index("Customer")
+        previous = customers[customers["YearWeek"] == prev_week].set_index("Customer")
+        table = pd.DataFrame({
+            "Ruter": current["Routes"],
+            "Ruter (forrige uge)": previous["Routes"].reindex(current.index).fillna(0).astype(int),
+            "Ekstra minutter": current["ExtraMinutes"].round(0),
+            "Prisdelta": current["PriceDelta"].round(0),
+        })
+        table["Ændring"] = table["Ruter"] - table["Ruter (forrige uge)"]
+        st.dataframe(table.sort_values("Ruter", ascending=False), use_container_width=True)
 
     st.markdown("---")
 
     # Table + download
     st.subheader("Historik")
-    st.dataframe(df, use_container_width=True)
+    st.dataframe(
+        weekly[["YearWeek", "Routes", "ExtraMinutes", "PriceDelta", "UpdatedAt"]],
+        use_container_width=True,
+    )
 
     st.download_button(
         "Download historik (JSON)",
-        data=json.dumps(log, ensure_ascii=False, indent=2).encode("utf-8"),
+        data=export_weekly_log_json(),
         file_name="controlling_weekly_log.json",
         mime="application/json",
     )
@@ -101,7 +131,9 @@ def overviewnotes_tab():
 
         with col_a:
             if st.button("Nulstil historik"):
-                write_weekly_log({})
+                reset_weekly_log()
+                # Controlling-fanens gemte analyse skal køres og logges igen forfra
+                st.session_state.pop("controlling_analysis", None)
                 st.success("Historik nulstillet.")
                 st.rerun()
 
@@ -112,8 +144,7 @@ def overviewnotes_tab():
                     imported = json.loads(up.read().decode("utf-8"))
                     if isinstance(imported, dict):
                         # merge (imported overwrites same weeks)
-                        merged = {**log, **imported}
-                        write_weekly_log(merged)
+                        import_weekly_log(imported)
                         st.success("Historik importeret/merged.")
                         st.rerun()
                     else:
@@ -0,0 +1,164 @@
+# perf.py
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+# Hver måling tilføjes som én JSON-linje, så hotspots kan findes på tværs af rigtige uploads
+PERF_LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "perf_log.jsonl")
+
+_log_lock = threading.Lock()
+# Den aktive måling for det faneblad, der kører i denne tråd/session
+_current: contextvars.ContextVar["TabTimer | None"] = contextvars.ContextVar("perf_timer", default=None)
+
+# --- Måling -----------------------------------------------------------------
+
+def _frame_mb(df) -> float | None:
+    if not isinstance(df, pd.DataFrame):
+        return None
+    return round(df.memory_usage(deep=True).sum() / 1024 ** 2, 2)
+
+class Stage:
+    """Ét målt trin. Angiv DataFrames med `input()` og `output()` for rækker og hukommelse."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.rows_in = None
+        self.rows_out = None
+        self.memory_mb = None
+
+    def input(self, df) -> None:
+        self.rows_in = len(df)
+
+    def output(self, df) -> None:
+        self.rows_out = len(df)
+        self.memory_mb = _frame_mb(df)
+
+    def as_dict(self) -> dict:
+        return {
+            "stage": self.name,
+            "seconds": round(self.seconds, 4),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "memory_mb": self.memory_mb,
+        }
+
+class TabTimer:
+    """Samler trinene for én kørsel af et faneblad."""
+
+    def __init__(self, tab: str):
+        self.tab = tab
+        self.stages: list[Stage] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        s = Stage(name)
+        start = time.perf_counter()
+        try:
+            yield s
+        finally:
+            s.seconds = time.perf_counter() - start
+            self.stages.append(s)
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame([s.as_dict() for s in self.stages])
+
+    def write_log(self, path: str = PERF_LOG_PATH) -> None:
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        lines = [
+            json.dumps({"timestamp": timestamp, "tab": self.tab, **s.as_dict()}, ensure_ascii=False)
+            for s in self.stages
+        ]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+class _NullTimer(TabTimer):
+    """Bruges når et trin kører uden for et instrumenteret faneblad (fx fra cli.py)."""
+
+    def __init__(self):
+        super().__init__("")
+
+    @contextmanager
+    def stage(self, name: str):
+        yield Stage(name)
+
+def stage(name: str):
+    """
+    Måler et trin i det aktive faneblad:
+
+        with stage("Indlæsning") as s:
+            df = read_table(...)
+            s.output(df)
+    """
+    return (_current.get() or _NullTimer()).stage(name)
+
+def deferred(name: str, fn):
+    """
+    Pakker `fn` ind, så den måles som trinet `name` i det aktive faneblad,
+    når den kaldes senere – fx lazy eksport, der først bygges ved klik på
+    en download-knap. Målingen skrives kun til loggen.
+    """
+    timer = _current.get()
+    if timer is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        later = TabTimer(timer.tab)
+        with later.stage(name) as s:
+            result = fn(*args, **kwargs)
+        s.memory_mb = round(len(result) / 1024 ** 2, 2) if isinstance(result, bytes) else None
+        try:
+            later.write_log()
+        except OSError:
+            pass
+        return result
+    return wrapper
+
+# --- Streamlit --------------------------------------------------------------
+
+def _render(timer: TabTimer) -> None:
+    import streamlit as st
+
+    with st.expander("Performance"):
+        df = timer.frame()
+        st.caption(f"Samlet tid: {df['seconds'].sum():.3f} sek.")
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+def instrumented(tab: str):
+    """
+    Decorator til et faneblad: trin målt med `stage()` vises i en
+    "Performance"-expander nederst og skrives til PERF_LOG_PATH – også når
+    fanebladet returnerer tidligt.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            timer = TabTimer(tab)
+            token = _current.set(timer)
+            completed = False
+            try:
+                result = fn(*args, **kwargs)
+                completed = True
+                return result
+            finally:
+                _current.reset(token)
+                if timer.stages:
+                    try:
+                        timer.write_log()
+                    except OSError:
+                        pass
+                    # Ikke ved st.stop()/st.rerun() eller fejl – der skal siden ikke tegnes videre
+                    if completed:
+                        _render(timer)
+        return wrapper
+    return decorator
@@ -1,97 +1,129 @@
-import io
-import re
-
 import pandas as pd
 import streamlit as st
-import matplotlib.pyplot as plt
+
+from export import download_df
+from history_store import read_revenue_estimates, save_revenue_estimates
+from ingest import UPLOAD_TYPES, read_table, validate_upload
+from perf import instrumented, stage
+from revenue_pipeline import (
+    OUTPUT_COLUMNS,
+    REVENUE_SCHEMA,
+    cohort_table,
+    customer_ids,
+    find_new_customers,
+    onboarding_success,
+    revenue_years,
+)
 
 # --- Hjælpefunktioner -------------------------------------------------------
 
-@st.cache_data
 def load_revenue_df(uploaded_file) -> pd.DataFrame:
     """Loader den uploadede Excel-rapport med header i række 5 og strip’er alle kolonnenavne."""
-    uploaded_file.seek(0)
-    df = pd.read_excel(uploaded_file, engine="openpyxl", header=4)
-    df.columns = df.columns.str.strip()
-    return df
-
-def download_df(df: pd.DataFrame, label: str, file_name: str) -> None:
-    """Pakker en DataFrame til en Streamlit-download-knap."""
-    buf = io.BytesIO()
-    df.to_excel(buf, index=False, engine="xlsxwriter")
-    st.download_button(
-        label=label,
-        data=buf.getvalue(),
-        file_name=file_name,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    return read_table(uploaded_file, REVENUE_SCHEMA)
 
 # --- Streamlit-faneblad -----------------------------------------------------
 
+@instrumented("revenue")
 def revenue_tab():
-    st.header("Onboarding-tracker for nye 2025-kunder")
+    st.header("Onboarding-tracker for nye kunder")
 
     # Trin 1: Upload
-    uploaded = st.file_uploader("1) Upload din Revenue-rapport (.xlsx)", type=["xlsx"])
+    uploaded = st.file_uploader(
+        "1) Upload din Revenue-rapport (.xlsx, .csv, .csv.gz eller .parquet)",
+        type=UPLOAD_TYPES,
+    )
     if not uploaded:
         return
-    df = load_revenue_df(uploaded)
-
-    # Trin 2: Find YTD 2025-kolonnen
-    total_candidates = [
-        c for c in df.columns
-        if re.fullmatch(r"(?i)(2025|YTD\s*2025)", c)
-    ]
-    if not total_candidates:
-        st.error("Kolonnen for YTD 2025 mangler: kig efter header '2025' eller 'YTD 2025'")
+    # Tjek overskrifterne i række 5, før hele filen parses
+    try:
+        with stage("Tjek af kolonner"):
+            validate_upload(uploaded, REVENUE_SCHEMA)
+    except ValueError as e:
+        st.error(f"{e}. Tjek at du har uploadet en Revenue-rapport.")
         return
-    total_col = total_candidates[0]
 
-    # Trin 3: Find 2016–2024-årskolonner
-    prev_years = [str(y) for y in range(2016, 2025)]
-    prev_cols = [c for c in prev_years if c in df.columns]
-
-    # Trin 4: Filtrer nye kunder
-    mask_prev_zero = (df[prev_cols] == 0).all(axis=1) if prev_cols else pd.Series(True, index=df.index)
-    mask_new       = pd.to_numeric(df[total_col], errors="coerce").fillna(0) > 0
-    df_new = df[mask_prev_zero & mask_new].copy()
+    with stage("Indlæsning") as s:
+        df = load_revenue_df(uploaded)
+        s.output(df)
+
+    # Trin 2: Find årskolonnerne og hver kundes første omsætningsår
+    try:
+        with stage("Første omsætningsår") as s:
+            s.input(df)
+            years = revenue_years(df)
+            cohorts = cohort_table(years)
+            s.output(cohorts)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    if not years.cohort_years:
+        st.error("Rapporten skal have mindst to årskolonner for at kunne finde nye kunder.")
+        return
 
-    # Trin 4b: Frasortér <1.000 kr.
-    df_new = df_new[pd.to_numeric(df_new[total_col], errors="coerce") > 1000]
+    with st.expander("Kohorter – nye kunder pr. første omsætningsår", expanded=False):
+        st.caption(
+            "Én række pr. år: antal kunder med første omsætning i året (over 1.000 kr.) "
+            f"og kohortens samlede omsætning i hvert år. {years.years[0]} er udeladt, "
+            "da kunder med omsætning allerede dengang kan være startet før rapporten."
+        )
+        st.dataframe(cohorts, use_container_width=True, hide_index=True)
+
+    # Trin 3–4: Vælg kohorteår og filtrér nye kunder
+    cohort = st.selectbox(
+        "Kohorteår", list(reversed(years.cohort_years)), index=0, key="revenue_cohort"
+    )
+    with stage("Nye kunder") as s:
+        s.input(df)
+        df_new, total_col = find_new_customers(df, cohort, years)
+        s.output(df_new)
 
-    st.subheader(f"Fundet {len(df_new)} nye kunder med ≥1.000 kr. i 2025-omsætning")
+    st.subheader(f"Fundet {len(df_new)} nye kunder med ≥1.000 kr. i {cohort}-omsætning")
     if df_new.empty:
         st.info("Ingen nye kunder efter kriteriet.")
         return
 
-    # Kort preview
-    preview_cols = [c for c in ["Name", "ID", total_col] if c in df_new.columns]
-    st.dataframe(df_new[preview_cols])
+    if "ID" not in df_new.columns:
+        st.error("Kolonnen 'ID' mangler – den bruges til at gemme estimater pr. kunde.")
+        return
 
-    # Trin 5: Formular til estimeret omsætning
+    # Trin 5: Redigérbar tabel med estimeret omsætning – gemte estimater forudfyldes
     st.subheader("2) Angiv estimeret årlig omsætning")
+    st.caption("Estimaterne gemmes pr. kunde-ID og er udfyldt næste gang kunden optræder.")
+    stored = read_revenue_estimates().set_index("ID")["EstPotential"]
+    grid = pd.DataFrame(
+        {
+            "Name": df_new["Name"] if "Name" in df_new.columns else "",
+            "ID": customer_ids(df_new["ID"]),
+            total_col: df_new[total_col],
+        }
+    )
+    grid["EstPotential"] = grid["ID"].map(stored)
+
     with st.form("estimation_form"):
-        potentials: dict[int, float] = {}
-        for idx, row in df_new.iterrows():
-            profile = row.get("Name", "")
-            cid     = row.get("ID", "")
-            label   = f"{profile} ({cid})"
-            potentials[idx] = st.number_input(
-                label,
-                min_value=0.0,
-                value=0.0,
-                step=1_000.0,
-                format="%.2f",
-                key=f"est_{idx}"
-            )
+        edited = st.data_editor(
+            grid,
+            column_config={
+                "EstPotential": st.column_config.NumberColumn(
+                    "Estimeret årlig omsætning", min_value=0.0, step=1_000.0, format="%.2f"
+                ),
+            },
+            disabled=["Name", "ID", total_col],
+            hide_index=True,
+            use_container_width=True,
+            key="revenue_estimates",
+        )
         do_analyze = st.form_submit_button("Analyser")
 
     if not do_analyze:
         return
 
-    # Trin 6: Beregn succes‐flag
-    df_new["EstPotential"]   = df_new.index.to_series().map(potentials)
-    df_new["OnboardSuccess"] = pd.to_numeric(df_new[total_col], errors="coerce") >= 0.1 * df_new["EstPotential"]
+    # Trin 6: Gem estimaterne og beregn succes‐flag
+    with stage("Onboarding-succes") as s:
+        s.input(df_new)
+        estimates = edited[["ID", "EstPotential"]]
+        save_revenue_estimates(estimates)
+        df_new = onboarding_success(df_new, total_col, estimates)
+        s.output(df_new)
 
     # Trin 7: KPI‐metrics
     total   = len(df_new)
@@ -99,32 +131,41 @@ def revenue_tab():
     fail    = total - success
 
     c1, c2, c3 = st.columns(3)
-    c1.metric("Nye kunder 2025",              total)
+    c1.metric(f"Nye kunder {cohort}",          total)
     c2.metric("Succesfuld onboarding (≥10%)", success)
     c3.metric("Under 10% omsætning",          fail)
 
+    missing = int(df_new["EstPotential"].isna().sum())
+    if missing:
+        st.caption(f"{missing} kunder mangler et estimat og tælles som under 10 %.")
+
     # Trin 8: Produkt‐fordeling
     if "Product" in df_new.columns:
         st.subheader("Produkt-fordeling")
-        counts = df_new["Product"].value_counts()
-        fig, ax = plt.subplots()
-        ax.pie(counts.values, labels=counts.index, autopct="%1.1f%%", startangle=90)
-        ax.axis("equal")
-        st.pyplot(fig)
+        # matplotlib importeres først her, så siden indlæses hurtigt
+        import matplotlib.pyplot as plt
+
+        with stage("Produkt-diagram") as s:
+            s.input(df_new)
+            counts = df_new["Product"].value_counts()
+            fig, ax = plt.subplots()
+            ax.pie(counts.values, labels=counts.index, autopct="%1.1f%%", startangle=90)
+            ax.axis("equal")
+            st.pyplot(fig)
 
     # Trin 9: Slutrapport – kun ønskede kolonner
-    out_cols = ["Name", "ID", "Category", "Sales", "SDM", "Product"]
-    out_cols = [c for c in out_cols if c in df_new.columns]
+    out_cols = [c for c in OUTPUT_COLUMNS if c in df_new.columns]
 
     st.subheader("Detaljer for nye kunder")
     st.dataframe(df_new[out_cols])
 
     # Trin 10: Download
-    download_df(
-        df_new[out_cols],
-        label="Download onboarding-rapport for nye 2025-kunder",
-        file_name="new_customers_onboarding_2025.xlsx"
-    )
+    with stage("Download-knapper"):
+        download_df(
+            df_new[out_cols],
+            label=f"Download onboarding-rapport for nye {cohort}-kunder",
+            file_name=f"new_customers_onboarding_{cohort}.xlsx"
+        )
 
 if __name__ == "__main__":
     st.set_page_config(page_title="CS Automation – Revenue")
@@ -0,0 +1,146 @@
+# revenue_pipeline.py
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from ingest import TableSchema
+
+REVENUE_SCHEMA = TableSchema(
+    columns=("Name", "ID", "Category", "Sales", "SDM", "Product"),
+    # Årskolonner som '2016' … '2024' og 'YTD 2025'
+    numeric_pattern=r"(?i)(YTD\s*)?\d{4}",
+    header=4,
+    # ID bruges som nøgle for de gemte estimater
+    required=("ID",),
+)
+
+OUTPUT_COLUMNS = ["Name", "ID", "Category", "Sales", "SDM", "Product"]
+
+# Årskolonner: '2016', '2024', 'YTD 2025' osv.
+YEAR_COLUMN = re.compile(r"(?i)(?:YTD\s*)?(\d{4})")
+# Omsætning i kohorteåret, der kræves for at tælle som ny kunde
+MIN_COHORT_REVENUE = 1000
+
+@dataclass(frozen=True)
+class RevenueYears:
+    """
+    Årskolonnerne i en Revenue-rapport som én numerisk matrix (kunder × år,
+    stigende år) samt hver kundes første år med omsætning.
+    """
+    years: tuple[int, ...]
+    columns: tuple[str, ...]
+    matrix: np.ndarray
+    first_year: pd.Series
+
+    def column(self, year: int) -> str:
+        return self.columns[self.years.index(year)]
+
+    @property
+    def cohort_years(self) -> tuple[int, ...]:
+        """
+        År der kan bruges som kohorte. Rapportens første år er udeladt: en
+        kunde med omsætning allerede dengang kan være startet før rapporten.
+        """
+        return self.years[1:]
+
+def revenue_years(df: pd.DataFrame) -> RevenueYears:
+    """
+    Finder årskolonnerne automatisk og beregner i ét gennemløb over
+    matricen hver kundes første år med omsætning ≠ 0 (manglende værdier
+    tæller som 0). Kunder uden omsætning får <NA>. Rejser ValueError hvis
+    rapporten ikke har nogen årskolonner.
+    """
+    by_year: dict[int, str] = {}
+    for col in df.columns:
+        m = YEAR_COLUMN.fullmatch(str(col).strip())
+        if m:
+            by_year.setdefault(int(m.group(1)), col)
+    if not by_year:
+        raise ValueError("Ingen årskolonner fundet: kig efter headere som '2024' eller 'YTD 2025'")
+
+    years = tuple(sorted(by_year))
+    columns = tuple(by_year[y] for y in years)
+    matrix = (
+        df[list(columns)]
+        .apply(pd.to_numeric, errors="coerce")
+        .to_numpy(dtype="float64", na_value=0.0)
+    )
+    active = matrix != 0
+    first_idx = active.argmax(axis=1)
+    first_year = pd.Series(
+        np.asarray(years)[first_idx], index=df.index, dtype="Int64"
+    ).where(active.any(axis=1))
+    return RevenueYears(years, columns, matrix, first_year)
+
+def find_new_customers(
+    df: pd.DataFrame,
+    cohort: int | None = None,
+    years: RevenueYears | None = None,
+) -> tuple[pd.DataFrame, str]:
+    """
+    Finder nye kunder i kohorteåret `cohort` (standard: seneste år i
+    rapporten): første omsætning i det år og over 1.000 kr. i årets
+    kolonne. Returnerer (nye kunder, navnet på årets kolonne). `years` kan
+    gives, hvis matricen allerede er beregnet. Rejser ValueError hvis året
+    ikke findes i rapporten eller er rapportens første år.
+    """
+    years = years or revenue_years(df)
+    cohort = years.years[-1] if cohort is None else cohort
+    if cohort not in years.years:
+        raise ValueError(f"Kolonnen for {cohort} mangler i rapporten")
+    if cohort not in years.cohort_years:
+        raise ValueError(
+            f"{cohort} er rapportens første år – nye kunder kan ikke skelnes fra "
+            "kunder, der startede før rapporten"
+        )
+    total_col = years.column(cohort)
+
+    revenue = years.matrix[:, years.years.index(cohort)]
+    mask = (years.first_year == cohort).fillna(False).to_numpy() & (revenue > MIN_COHORT_REVENUE)
+    return df[mask].copy(), total_col
+
+def cohort_table(years: RevenueYears) -> pd.DataFrame:
+    """
+    Alle kohorter på én gang: én række pr. første omsætningsår med antal
+    nye kunder (over 1.000 kr. i det år) og kohortens samlede omsætning i
+    hvert af rapportens år. Rapportens første år er ikke en kohorte.
+    """
+    first = years.first_year.to_numpy(dtype="float64", na_value=np.nan)
+    cohort_idx = np.searchsorted(years.years, first)
+    valid = ~np.isnan(first) & (first > years.years[0])
+    new = np.zeros(len(first), dtype=bool)
+    new[valid] = years.matrix[valid, cohort_idx[valid]] > MIN_COHORT_REVENUE
+
+    revenue = pd.DataFrame(years.matrix[new], columns=[str(c) for c in years.columns])
+    revenue.insert(0, "Kohorte", first[new].astype(int))
+    table = revenue.groupby("Kohorte").sum()
+    table.insert(0, "Nye kunder", revenue.groupby("Kohorte").size())
+    return table.reindex(list(years.cohort_years), fill_value=0).rename_axis("Kohorte").reset_index()
+
+def customer_ids(ids: pd.Series) -> pd.Series:
+    """
+    Kunde-ID som tekst, så de kan bruges som nøgle for gemte estimater –
+    også når Excel har læst dem som decimaltal (12345.0).
+    """
+    text = ids.astype(str).str.strip().str.replace(r"\.0+$", "", regex=True)
+    return text.where(ids.notna())
+
+def onboarding_success(df_new: pd.DataFrame, total_col: str, estimates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tilføjer EstPotential og OnboardSuccess (omsætning ≥ 10 % af estimeret
+    årlig omsætning). `estimates` har kolonnerne ID og EstPotential og
+    joines på kunde-ID; kunder uden estimat får OnboardSuccess = False.
+    """
+    est = (
+        estimates.assign(ID=customer_ids(estimates["ID"]))
+        .dropna(subset=["ID"])
+        .drop_duplicates("ID", keep="last")
+        .set_index("ID")["EstPotential"]
+    )
+    df_new = df_new.copy()
+    df_new["EstPotential"]   = customer_ids(df_new["ID"]).map(pd.to_numeric(est, errors="coerce"))
+    df_new["OnboardSuccess"] = pd.to_numeric(df_new[total_col], errors="coerce") >= 0.1 * df_new["EstPotential"]
+    return df_new
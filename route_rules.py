@@ -0,0 +1,74 @@
+# route_rules.py
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from matching import KeywordMatcher
+
+# --- Hjælpefunktioner -------------------------------------------------------
+
+def customer_keys(names: pd.Series) -> pd.Series:
+    """
+    Normaliserede kundenavne (trimmet, små bogstaver) til opslag i reglerne.
+    Kategoriske kolonner normaliseres via kategorierne i stedet for pr. række.
+    """
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        cats = names.cat.categories.astype(str).str.strip().str.lower()
+        # Kode -1 (manglende værdi) peger på det sidste element, ""
+        lookup = np.append(cats.to_numpy(dtype=object), "")
+        return pd.Series(lookup[names.cat.codes.to_numpy()], index=names.index, dtype=object)
+    return names.fillna("").astype(str).str.strip().str.lower()
+
+# --- Regelsæt ---------------------------------------------------------------
+
+class RouteRules:
+    """
+    Kompileret udgave af controlling_rules.json.
+
+    Reglerne omsættes én gang til opslagstabeller, så hver regel evalueres
+    som ét vektoriseret opslag over hele kolonnen – uanset hvor mange
+    kundespecifikke regler filen indeholder.
+    """
+
+    def __init__(self, rules: dict):
+        # Ændres når reglerne ændres – bruges til at ugyldiggøre gemte resultater
+        self.fingerprint = hashlib.blake2b(
+            json.dumps(rules, sort_keys=True, ensure_ascii=False).encode("utf-8"),
+            digest_size=16,
+        ).hexdigest()
+        min_duration = rules.get("min_act_duration", {})
+        self.default_min_duration = float(min_duration.get("default", 0))
+        self.min_duration_by_customer = {
+            name.strip().lower(): float(minutes)
+            for name, minutes in min_duration.get("customers", {}).items()
+        }
+        self.exclude_customers = frozenset(
+            name.strip().lower() for name in rules.get("exclude_customers", [])
+        )
+        self.quicknotes_categories = [
+            c for c in rules.get("quicknotes_categories", []) if c.strip()
+        ]
+        self.quicknotes_matcher = KeywordMatcher(self.quicknotes_categories)
+        self._category_by_pattern = {c.lower(): c for c in self.quicknotes_categories}
+
+    def excluded(self, keys: pd.Series) -> pd.Series:
+        """Maske for ruter hvis kunde er frasorteret (`keys` fra `customer_keys`)."""
+        return keys.isin(self.exclude_customers)
+
+    def min_duration(self, keys: pd.Series) -> pd.Series:
+        """Minimum realiseret tid (minutter) pr. rute ud fra kunden."""
+        return keys.map(self.min_duration_by_customer).fillna(self.default_min_duration)
+
+    def quicknotes_category(self, notes: pd.Series) -> pd.Series:
+        """Første QuickNotes-kategori (i regelfilens rækkefølge) pr. rute, ellers None."""
+        hits = self.quicknotes_matcher.match_series(notes)
+        return hits.map(lambda h: self._category_by_pattern[h[0]] if h else None)
+
+
+def load_route_rules(path: str) -> RouteRules:
+    """Læser og kompilerer regelfilen (se controlling_pipeline.RULES_PATH)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return RouteRules(json.load(f))
@@ -0,0 +1,129 @@
+# route_store.py
+
+import os
+import shutil
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Parquet-datasæt partitioneret som data/routes/yearweek=YYYYWW/part-0.parquet
+ROUTES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "routes")
+
+ROUTE_SCHEMA = pa.schema([
+    ("SessionId", pa.string()),
+    ("Date", pa.timestamp("ms")),
+    ("CustomerName", pa.string()),
+    ("EstDuration", pa.float64()),
+    ("ActDuration", pa.float64()),
+    ("Price", pa.float64()),
+    ("ActPrice", pa.float64()),
+    ("QuickNotesCategory", pa.string()),
+])
+
+_PARTITIONING = ds.partitioning(pa.schema([("yearweek", pa.string())]), flavor="hive")
+
+# --- Skrivning --------------------------------------------------------------
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    out = pd.DataFrame(index=df.index)
+    for field in ROUTE_SCHEMA:
+        col = df[field.name] if field.name in df.columns else pd.Series(None, index=df.index)
+        if pa.types.is_string(field.type):
+            out[field.name] = col.astype(str).astype(object).where(col.notna(), None)
+        elif pa.types.is_timestamp(field.type):
+            out[field.name] = pd.to_datetime(col, errors="coerce")
+        else:
+            out[field.name] = pd.to_numeric(col, errors="coerce").astype("float64")
+    return pa.Table.from_pandas(out, schema=ROUTE_SCHEMA, preserve_index=False)
+
+def write_week_routes(yearweek: str, df: pd.DataFrame) -> None:
+    """
+    Gemmer ugens matchede ruter (erstatter en evt. tidligere version af
+    ugen). Filen skrives først ved siden af og flyttes derefter på plads,
+    så læsere aldrig ser en halvt skrevet partition.
+    """
+    part_dir = os.path.join(ROUTES_DIR, f"yearweek={yearweek}")
+    os.makedirs(part_dir, exist_ok=True)
+    tmp_path = os.path.join(part_dir, f".part-{uuid.uuid4().hex}.tmp")
+    pq.write_table(_to_table(df), tmp_path, compression="zstd")
+    os.replace(tmp_path, os.path.join(part_dir, "part-0.parquet"))
+
+def write_week_fingerprints(yearweek: str, fingerprints: pd.DataFrame, rules_fingerprint: str) -> None:
+    """
+    Gemmer et hash pr. SessionId af ugens *uploadede* rækker (ikke kun de
+    matchede) sammen med fingeraftrykket af regelsættet. Bruges til at
+    genkende uændrede ruter, når en uge uploades igen.
+    """
+    part_dir = os.path.join(ROUTES_DIR, f"yearweek={yearweek}")
+    os.makedirs(part_dir, exist_ok=True)
+    table = pa.table({
+        "SessionId": pa.array(fingerprints["SessionId"].astype(str).tolist(), pa.string()),
+        "RowHash": pa.array(fingerprints["RowHash"].to_numpy(), pa.uint64()),
+    }).replace_schema_metadata({"rules_fingerprint": rules_fingerprint})
+    tmp_path = os.path.join(part_dir, f".fingerprints-{uuid.uuid4().hex}.tmp")
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, os.path.join(part_dir, "fingerprints.parquet"))
+
+def read_week_fingerprints(yearweek: str) -> tuple[pd.DataFrame, str] | None:
+    """Returnerer (SessionId/RowHash, regel-fingeraftryk) for ugen, eller None."""
+    path = os.path.join(ROUTES_DIR, f"yearweek={yearweek}", "fingerprints.parquet")
+    if not os.path.exists(path):
+        return None
+    table = pq.read_table(path)
+    metadata = table.schema.metadata or {}
+    rules_fingerprint = metadata.get(b"rules_fingerprint", b"").decode("utf-8")
+    return table.to_pandas(), rules_fingerprint
+
+def delete_week_fingerprints(yearweek: str) -> None:
+    path = os.path.join(ROUTES_DIR, f"yearweek={yearweek}", "fingerprints.parquet")
+    if os.path.exists(path):
+        os.remove(path)
+
+def delete_week_routes(yearweek: str) -> None:
+    shutil.rmtree(os.path.join(ROUTES_DIR, f"yearweek={yearweek}"), ignore_errors=True)
+
+# --- Forespørgsler ----------------------------------------------------------
+
+def stored_weeks() -> list[str]:
+    """Alle uger (YYYYWW) der har gemte ruter, sorteret stigende."""
+    if not os.path.isdir(ROUTES_DIR):
+        return []
+    weeks = [
+        name.split("=", 1)[1]
+        for name in os.listdir(ROUTES_DIR)
+        if name.startswith("yearweek=")
+        and os.path.exists(os.path.join(ROUTES_DIR, name, "part-0.parquet"))
+    ]
+    return sorted(weeks)
+
+def read_routes(
+    weeks: list[str] | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Læser gemte ruter. Kun partitionerne for `weeks` og kun de ønskede
+    `columns` læses fra disk; kolonnen YearWeek er altid med.
+    """
+    available = stored_weeks()
+    if weeks is not None:
+        wanted = set(str(w) for w in weeks)
+        available = [w for w in available if w in wanted]
+    if columns is None:
+        columns = ROUTE_SCHEMA.names
+    if not available:
+        return pd.DataFrame(columns=["YearWeek", *columns])
+
+    paths = [os.path.join(ROUTES_DIR, f"yearweek={w}", "part-0.parquet") for w in available]
+    dataset = ds.dataset(
+        paths,
+        schema=ROUTE_SCHEMA.append(pa.field("yearweek", pa.string())),
+        format="parquet",
+        partitioning=_PARTITIONING,
+        partition_base_dir=ROUTES_DIR,
+    )
+    table = dataset.to_table(columns=list(columns) + ["yearweek"])
+    df = table.to_pandas()
+    return df.rename(columns={"yearweek": "YearWeek"})[["YearWeek", *columns]]
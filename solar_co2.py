@@ -1,5 +1,77 @@
+# solar_co2.py
+
 import streamlit as st
 
+from co2_pipeline import (
+    CO2_SCHEMA,
+    REQUIRED_COLUMNS,
+    cached_co2_report,
+    co2_report,
+    load_emission_factors,
+)
+from export import download_df
+from ingest import UPLOAD_TYPES, validate_upload
+from perf import instrumented, stage
+
+@instrumented("solar_co2")
 def solar_co2_tab():
     st.title("Solar CO2 Report")
-    st.write("Denne fane er under udvikling.")
+    st.caption(
+        "Upload en eller flere måneders RouteStat-data. CO2 beregnes som kørte km × "
+        "emissionsfaktoren for rutens køretøjstype (emission_factors.json)."
+    )
+
+    factors = load_emission_factors()
+    with st.expander("Emissionsfaktorer"):
+        st.dataframe(factors.table(), use_container_width=True, hide_index=True)
+        st.caption(f"Ukendte køretøjstyper får standardfaktoren {factors.default} {factors.unit}.")
+
+    uploaded = st.file_uploader(
+        "Upload RouteStat-data (.xlsx, .csv, .csv.gz eller .parquet)",
+        type=UPLOAD_TYPES,
+        key="solar_co2_routestat",
+    )
+    if not uploaded:
+        return
+
+    try:
+        # Er filen allerede beregnet, er den også tjekket – spring tjekket over
+        report = cached_co2_report(uploaded, factors)
+        if report is None:
+            with stage("Tjek af kolonner"):
+                validate_upload(uploaded, CO2_SCHEMA)
+            with stage("CO2-beregning") as s:
+                with st.spinner("Beregner CO2 …"):
+                    report = co2_report(uploaded, factors)
+                s.output(report["per_route"])
+    except ValueError as e:
+        st.error(str(e))
+        st.caption("Forventede kolonner: " + ", ".join(f"`{c}`" for c in REQUIRED_COLUMNS))
+        return
+
+    if report["unknown_types"]:
+        st.warning(
+            "Køretøjstyper uden egen faktor (standardfaktoren er brugt): "
+            + ", ".join(report["unknown_types"])
+        )
+
+    per_week = report["per_week"]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Ruter", f"{len(report['per_route']):,}")
+    c2.metric("Kørte km", f"{per_week['Km'].sum():,.0f}")
+    c3.metric("CO2 i alt", f"{per_week['CO2 (kg)'].sum() / 1000:,.1f} t")
+
+    st.markdown("#### Pr. uge")
+    st.bar_chart(per_week.set_index("Uge")["CO2 (kg)"])
+    st.dataframe(per_week, use_container_width=True, hide_index=True)
+
+    st.markdown("#### Pr. køretøjstype")
+    st.dataframe(report["per_vehicle"], use_container_width=True, hide_index=True)
+
+    st.markdown("#### Pr. rute")
+    st.dataframe(report["per_route"], use_container_width=True, hide_index=True)
+
+    with stage("Download-knapper"):
+        download_df(per_week, "Download CO2 pr. uge", "solar_co2_pr_uge.xlsx")
+        download_df(report["per_vehicle"], "Download CO2 pr. køretøjstype", "solar_co2_pr_koeretoej.xlsx")
+        download_df(report["per_route"], "Download CO2 pr. rute", "solar_co2_pr_rute.xlsx")
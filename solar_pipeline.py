@@ -0,0 +1,143 @@
+# solar_pipeline.py
+
+import pandas as pd
+
+from ingest import CHUNK_ROWS, TableSchema, iter_table_chunks
+
+# Kolonnerne i Solars RouteStat-eksport (samme navngivning som warehouse'ets
+# øvrige rute-rapporter). Ret her, hvis eksporten ændrer overskrifter.
+ROUTE_ID = "RouteId"
+DATE = "Date"
+PLANNED_START = "EstimatedStartTime"
+ACTUAL_START = "ActualStartTime"
+PLANNED_DURATION = "EstimateDuration (min)"
+ACTUAL_DURATION = "ActualDuration (min)"
+STOPS = "Stops"
+
+REQUIRED_COLUMNS = [ROUTE_ID, DATE, PLANNED_DURATION, ACTUAL_DURATION]
+
+ROUTESTAT_SCHEMA = TableSchema(
+    columns=(ROUTE_ID, DATE, PLANNED_START, ACTUAL_START, PLANNED_DURATION, ACTUAL_DURATION, STOPS),
+    numeric=(PLANNED_DURATION, ACTUAL_DURATION, STOPS),
+    dates=(DATE, PLANNED_START, ACTUAL_START),
+    required=tuple(REQUIRED_COLUMNS),
+)
+
+# En rute er til tiden, hvis den starter højst så mange minutter efter planen
+ON_TIME_TOLERANCE_MIN = 15
+# Antal delresultater der samles op, før de lægges sammen til ét
+_COMPACT_EVERY = 16
+
+# Summerbare delresultater – KPI'erne beregnes først til sidst. Antal ruter
+# er ikke summerbart (en rute kan have flere rækker) og tælles for sig.
+_SUMS = ["OnTime", "OnTimeKnown", "Planned", "Actual", "Stops"]
+
+# --- Aggregering ------------------------------------------------------------
+
+def _partials(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Én række pr. rute i bidden med de summerbare størrelser."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError("Manglende kolonner i RouteStat-filen: " + ", ".join(missing))
+
+    if PLANNED_START in chunk.columns and ACTUAL_START in chunk.columns:
+        late = (chunk[ACTUAL_START] - chunk[PLANNED_START]).dt.total_seconds() / 60
+        known = late.notna()
+        on_time = (late <= ON_TIME_TOLERANCE_MIN) & known
+    else:
+        known = on_time = pd.Series(False, index=chunk.index)
+
+    return pd.DataFrame(
+        {
+            "Day": chunk[DATE].dt.normalize(),
+            "RouteId": chunk[ROUTE_ID].astype(str),
+            "OnTime": on_time.astype("int64"),
+            "OnTimeKnown": known.astype("int64"),
+            "Planned": chunk[PLANNED_DURATION].fillna(0),
+            "Actual": chunk[ACTUAL_DURATION].fillna(0),
+            "Stops": chunk[STOPS].fillna(0) if STOPS in chunk.columns else 0,
+        }
+    )
+
+def _combine(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    return pd.concat(parts).groupby(level=0).sum()
+
+def _kpis(sums: pd.DataFrame, routes: pd.Series | None = None) -> pd.DataFrame:
+    """KPI'er ud fra summerne; `routes` er antal forskellige ruter pr. række i `sums`."""
+    known = sums["OnTimeKnown"].where(sums["OnTimeKnown"] > 0)
+    stops = sums["Stops"].where(sums["Stops"] > 0)
+    out = pd.DataFrame(
+        {
+            "Til tiden (%)": (100 * sums["OnTime"] / known).round(1),
+            "Planlagt (min)": sums["Planned"].round(0),
+            "Realiseret (min)": sums["Actual"].round(0),
+            "Afvigelse (min)": (sums["Actual"] - sums["Planned"]).round(0),
+            "Afvigelse (%)": (100 * (sums["Actual"] / sums["Planned"].where(sums["Planned"] > 0) - 1)).round(1),
+            "Stop": sums["Stops"].astype("int64"),
+            "Min pr. stop": (sums["Actual"] / stops).round(1),
+        },
+        index=sums.index,
+    )
+    if routes is not None:
+        out.insert(0, "Ruter", routes.reindex(sums.index, fill_value=0).astype("int64"))
+    return out
+
+class RouteStatKpis:
+    """
+    Streaming-aggregering af en RouteStat-fil. Hver bid reduceres straks til
+    summer pr. dag og pr. rute; kun de summer gemmes, så filen aldrig skal
+    være i hukommelsen på én gang. En rute, der er delt over to bidder,
+    lægges sammen til sidst. "Ruter" er antal forskellige RouteId'er – i
+    alt og pr. dag – ligesom i CO2-fanen.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._by_day: list[pd.DataFrame] = []
+        self._by_route: list[pd.DataFrame] = []
+        self._day_routes: list[pd.DataFrame] = []
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        partial = _partials(chunk)
+        self.rows += len(partial)
+        self._by_day.append(partial.groupby("Day")[_SUMS].sum())
+        self._by_route.append(partial.groupby("RouteId")[_SUMS].sum())
+        self._day_routes.append(partial[["Day", "RouteId"]].drop_duplicates())
+        if len(self._by_route) >= _COMPACT_EVERY:
+            self._by_day = [_combine(self._by_day)]
+            self._by_route = [_combine(self._by_route)]
+            self._day_routes = [pd.concat(self._day_routes).drop_duplicates()]
+
+    def per_day(self) -> pd.DataFrame:
+        if not self._by_day:
+            return _kpis(pd.DataFrame(columns=_SUMS, dtype="float64"), pd.Series(dtype="int64"))
+        routes = pd.concat(self._day_routes).drop_duplicates().groupby("Day").size()
+        out = _kpis(_combine(self._by_day), routes).sort_index()
+        out.index = out.index.strftime("%Y-%m-%d")
+        return out.rename_axis("Dato").reset_index()
+
+    def per_route(self) -> pd.DataFrame:
+        if not self._by_route:
+            return _kpis(pd.DataFrame(columns=_SUMS, dtype="float64"))
+        out = _kpis(_combine(self._by_route))
+        return out.sort_values("Afvigelse (min)", ascending=False).rename_axis("RouteId").reset_index()
+
+    def totals(self) -> dict:
+        if not self._by_day:
+            sums = pd.DataFrame([[0] * len(_SUMS)], columns=_SUMS)
+            return _kpis(sums, pd.Series([0])).iloc[0].to_dict()
+        by_route = _combine(self._by_route)
+        sums = by_route[_SUMS].sum().to_frame().T
+        return _kpis(sums, pd.Series([len(by_route)])).iloc[0].to_dict()
+
+def routestat_kpis(uploaded, chunk_rows: int = CHUNK_ROWS, progress=None) -> RouteStatKpis:
+    """
+    Læser en RouteStat-fil i bidder og returnerer de samlede KPI'er.
+    `progress(rows)` kaldes efter hver bid med antal læste rækker.
+    """
+    kpis = RouteStatKpis()
+    for chunk in iter_table_chunks(uploaded, ROUTESTAT_SCHEMA, chunk_rows):
+        kpis.add(chunk)
+        if progress is not None:
+            progress(kpis.rows)
+    return kpis
@@ -2,9 +2,99 @@
 
 import streamlit as st
 import pandas as pd
-import io
 from datetime import date, timedelta
 
+from export import download_df
+from ingest import UPLOAD_TYPES, content_hash, upload_bytes, validate_upload
+from perf import instrumented, stage
+from solar_pipeline import REQUIRED_COLUMNS, ROUTESTAT_SCHEMA, routestat_kpis
+
+# --- KPI'er -----------------------------------------------------------------
+
+def _cached_kpis(key: str) -> dict | None:
+    """KPI'erne fra sessionen, hvis de er beregnet for filen med hashet `key`."""
+    cached = st.session_state.get("solar_kpis")
+    return cached if cached is not None and cached["key"] == key else None
+
+def _load_kpis(uploaded, key: str) -> dict:
+    """
+    Beregner KPI'erne for en RouteStat-fil i bidder. Resultatet gemmes i
+    sessionen mod filens hash, så reruns ikke læser filen igen.
+    """
+    # Antallet af rækker kendes først, når filen er læst – vis fremdrift som tekst
+    status = st.empty()
+    status.caption("Læser RouteStat …")
+    kpis = routestat_kpis(uploaded, progress=lambda rows: status.caption(f"{rows:,} rækker læst …"))
+    status.empty()
+    cached = {
+        "key": key,
+        "rows": kpis.rows,
+        "totals": kpis.totals(),
+        "per_day": kpis.per_day(),
+        "per_route": kpis.per_route(),
+    }
+    st.session_state["solar_kpis"] = cached
+    return cached
+
+def kpi_section() -> None:
+    st.markdown("---")
+    st.subheader("Analyse af RouteStat")
+    uploaded = st.file_uploader(
+        "Upload Solar RouteStat-rapport (.xlsx, .csv, .csv.gz eller .parquet)",
+        type=UPLOAD_TYPES,
+        key="solar_routestat",
+    )
+    if not uploaded:
+        return
+
+    try:
+        # Ved reruns ligger KPI'erne i sessionen – så er filen allerede tjekket
+        key = content_hash(upload_bytes(uploaded))
+        result = _cached_kpis(key)
+        if result is None:
+            with stage("Tjek af kolonner"):
+                validate_upload(uploaded, ROUTESTAT_SCHEMA)
+            with stage("KPI-beregning") as s:
+                result = _load_kpis(uploaded, key)
+                s.output(result["per_route"])
+    except ValueError as e:
+        st.error(str(e))
+        st.caption("Forventede kolonner: " + ", ".join(f"`{c}`" for c in REQUIRED_COLUMNS))
+        return
+
+    if result["rows"] == 0:
+        st.warning("Filen indeholder ingen ruter.")
+        return
+
+    totals = result["totals"]
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Ruter", f"{int(totals['Ruter']):,}")
+    c2.metric("Til tiden", "–" if pd.isna(totals["Til tiden (%)"]) else f"{totals['Til tiden (%)']:.1f} %")
+    c3.metric(
+        "Realiseret vs. planlagt",
+        f"{totals['Realiseret (min)']:,.0f} min",
+        delta=f"{totals['Afvigelse (min)']:+,.0f} min",
+        delta_color="inverse",
+    )
+    c4.metric("Stop", f"{int(totals['Stop']):,}")
+
+    per_day = result["per_day"]
+    st.markdown("#### Pr. dag")
+    st.bar_chart(per_day.set_index("Dato")[["Planlagt (min)", "Realiseret (min)"]], stack=False)
+    st.dataframe(per_day, use_container_width=True, hide_index=True)
+
+    per_route = result["per_route"]
+    st.markdown("#### Pr. rute")
+    st.caption("Sorteret efter største afvigelse fra planlagt tid.")
+    st.dataframe(per_route, use_container_width=True, hide_index=True)
+
+    with stage("Download-knapper"):
+        download_df(per_day, "Download KPI'er pr. dag", "solar_kpi_pr_dag.xlsx")
+        download_df(per_route, "Download KPI'er pr. rute", "solar_kpi_pr_rute.xlsx")
+
+# --- Streamlit-faneblad -----------------------------------------------------
+
+@instrumented("solar_weekly")
 def solar_weekly_tab():
     st.title("Solar Weekly RouteStat-Report")
 
@@ -29,4 +119,5 @@ def solar_weekly_tab():
     )
     st.markdown(f"[Download rå rapport]({url})", unsafe_allow_html=True)
     st.info("Klik for at hente Solar RouteStat rapport for sidste uge")
-    
+
+    kpi_section()
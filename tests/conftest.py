@@ -0,0 +1,20 @@
+# tests/conftest.py
+
+import os
+import sys
+
+import pytest
+
+# Modulerne ligger fladt i repo-roden
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Peger historik og rutelager på en midlertidig mappe."""
+    import history_store
+    import route_store
+
+    monkeypatch.setattr(history_store, "DB_PATH", str(tmp_path / "controlling_history.sqlite"))
+    monkeypatch.setattr(history_store, "LEGACY_LOG_PATH", str(tmp_path / "controlling_weekly_log.json"))
+    monkeypatch.setattr(route_store, "ROUTES_DIR", str(tmp_path / "routes"))
+    return tmp_path
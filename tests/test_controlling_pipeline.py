@@ -0,0 +1,87 @@
+# tests/test_controlling_pipeline.py
+
+import pandas as pd
+
+from benchmarks import generators
+from controlling_pipeline import (
+    CONTROLLING_SCHEMA,
+    detect_yearweek_from_dates,
+    pick_week_results,
+    run_incremental_pipeline,
+    store_week_result,
+)
+from history_store import read_weekly_log, reset_weekly_log
+from ingest import parse_table
+from route_store import read_routes, read_week_fingerprints
+
+def _upload(df: pd.DataFrame, fmt: str = "csv") -> pd.DataFrame:
+    """Samme vej som en upload: serialisér og parse efter skemaet."""
+    return parse_table(generators.to_upload_bytes(df, fmt), fmt, CONTROLLING_SCHEMA)
+
+def _analyse(df: pd.DataFrame):
+    week = detect_yearweek_from_dates(df)
+    df_q, stages, fingerprints, changes = run_incremental_pipeline(df, week)
+    store_week_result(week, df_q, fingerprints)
+    return week, df_q, changes
+
+def test_reupload_of_same_week_only_reruns_changed_routes(data_dir):
+    raw = generators.duration_controlling(2_000, seed=1)
+    _, first, changes = _analyse(_upload(raw))
+    assert changes is None
+
+    # Samme fil igen: alt er uændret, og resultatet er det samme
+    _, again, changes = _analyse(_upload(raw))
+    assert changes["unchanged"] == len(raw)
+    assert changes["new"] == changes["changed"] == changes["removed"] == 0
+    pd.testing.assert_frame_equal(again, first, check_dtype=False)
+
+    # Én ændret rute køres igennem filtrene igen
+    edited = raw.copy()
+    edited.loc[0, "QuickNotes"] = "ny tekst"
+    _, _, changes = _analyse(_upload(edited))
+    assert changes["changed"] == 1
+
+def test_reset_history_also_resets_incremental_baseline(data_dir):
+    raw = generators.duration_controlling(1_000, seed=4)
+    week, _, _ = _analyse(_upload(raw))
+    reset_weekly_log()
+    assert read_weekly_log() == {}
+    assert read_routes().empty
+    assert read_week_fingerprints(week) is None
+
+    # Næste upload af ugen analyseres forfra og logges igen
+    _, _, changes = _analyse(_upload(raw))
+    assert changes is None
+    assert week in read_weekly_log()
+
+def test_duplicate_session_ids_do_not_break_later_reupload(data_dir):
+    raw = generators.duration_controlling(500, seed=2)
+    dup = pd.concat([raw, raw.head(3)], ignore_index=True)
+    week, _, changes = _analyse(_upload(dup))
+    assert changes is None
+    assert read_week_fingerprints(week) is None
+
+    # En ren fil for samme uge analyseres forfra i stedet for at fejle
+    _, _, changes = _analyse(_upload(raw))
+    assert changes is None
+    _, _, changes = _analyse(_upload(raw))
+    assert changes["unchanged"] == len(raw)
+
+def test_blank_session_ids_are_stored_without_fingerprints(data_dir):
+    raw = generators.duration_controlling(300, seed=3).astype({"SessionId": object})
+    raw.loc[[5, 9], "SessionId"] = None
+    week, df_q, changes = _analyse(_upload(raw, "xlsx"))
+    assert changes is None
+    assert read_week_fingerprints(week) is None
+
+def test_same_week_in_two_files_picks_by_file_name():
+    results = [
+        {"name": "uge10_b.xlsx", "week": "202510"},
+        {"name": "uge10_a.xlsx", "week": "202510"},
+        {"name": "uge11.xlsx", "week": "202511"},
+    ]
+    for order in (results, results[::-1]):
+        chosen, warnings = pick_week_results(order)
+        assert chosen["202510"]["name"] == "uge10_b.xlsx"
+        assert [name for name, _ in warnings] == ["uge10_a.xlsx"]
+        assert "uge10_b.xlsx" in warnings[0][1]
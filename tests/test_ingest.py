@@ -0,0 +1,38 @@
+# tests/test_ingest.py
+
+import pandas as pd
+import pytest
+
+import ingest
+from benchmarks import generators
+from controlling_pipeline import CONTROLLING_SCHEMA
+from ingest import check_header
+
+def test_renamed_column_is_reported_with_suggestion():
+    df = generators.duration_controlling(20).rename(columns={"ActDuration": "ActualDuration"})
+    with pytest.raises(ValueError, match="'ActDuration' \\(mente du 'ActualDuration'\\?\\)"):
+        check_header(generators.to_upload_bytes(df, "csv"), "csv", CONTROLLING_SCHEMA)
+
+@pytest.mark.parametrize("fmt", ["excel", "parquet", "csv.gz"])
+def test_file_that_cannot_be_read_raises_value_error(fmt):
+    with pytest.raises(ValueError, match="kunne ikke læses"):
+        check_header(b"%PDF-1.4 ikke en rapport", fmt, CONTROLLING_SCHEMA)
+
+def test_xls_header_is_not_read_with_openpyxl(monkeypatch):
+    engines = []
+
+    def read_excel(source, engine=None, **kwargs):
+        engines.append(engine)
+        return pd.DataFrame(columns=list(CONTROLLING_SCHEMA.columns))
+
+    monkeypatch.setattr(ingest.pd, "read_excel", read_excel)
+    # .xls er en OLE2-fil, ikke en zip som .xlsx
+    check_header(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "excel", CONTROLLING_SCHEMA)
+    check_header(b"PK\x03\x04", "excel", CONTROLLING_SCHEMA)
+    assert engines == [ingest.EXCEL_ENGINE, "openpyxl"]
+
+@pytest.mark.parametrize("name", ["rapport.xlsx.gz", "noter.json.gz"])
+def test_only_csv_may_be_gzipped(name):
+    with pytest.raises(ValueError, match="csv.gz"):
+        ingest.upload_format(name)
+    assert ingest.upload_format("rapport.CSV.GZ") == "csv.gz"
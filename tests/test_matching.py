@@ -0,0 +1,26 @@
+# tests/test_matching.py
+
+import pandas as pd
+
+from ikea_nl_pipeline import analyse_supportnotes
+from matching import KeywordMatcher, normalize_text
+
+def test_normalize_text_keeps_danish_letters():
+    assert normalize_text("  Låst\tDØR  ") == "låst dør"
+    assert normalize_text("Æble") == "æble"
+    # Et å skrevet som a + kombinerende ring bevares også
+    assert normalize_text("La\u030ast") == "låst"
+    assert normalize_text("Café Über") == "cafe uber"
+
+def test_danish_keywords_do_not_match_their_ascii_lookalikes():
+    matcher = KeywordMatcher(["låst", "åben", "gågade"], normalize=normalize_text)
+    assert matcher.find("Driver said this was the last stop") == ()
+    assert matcher.find("elastic band broke") == ()
+    assert matcher.find("door was open, abend") == ()
+    assert matcher.find("Døren var LÅST") == ("låst",)
+
+def test_supportnotes_last_is_not_laast():
+    notes = pd.Series(["Driver said this was the last stop", "elastic band broke", "Døren var låst"])
+    result = analyse_supportnotes(notes)
+    assert result["Keywords"].tolist() == ["Nej", "Nej", "Ja"]
+    assert "låst" in result.loc[2, "MatchingKeyword"]
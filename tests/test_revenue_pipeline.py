@@ -0,0 +1,33 @@
+# tests/test_revenue_pipeline.py
+
+import pandas as pd
+import pytest
+
+from revenue_pipeline import cohort_table, find_new_customers, revenue_years
+
+def _report() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Name": ["Gammel", "Ny 2024", "Ny 2025", "Lille"],
+            "ID": [1, 2, 3, 4],
+            "2023": [5_000, 0, 0, 0],
+            "2024": [6_000, 2_000, 0, 500],
+            "YTD 2025": [7_000, 3_000, 4_000, 0],
+        }
+    )
+
+def test_first_report_year_is_not_a_cohort():
+    years = revenue_years(_report())
+    assert years.cohort_years == (2024, 2025)
+
+    table = cohort_table(years)
+    assert table["Kohorte"].tolist() == [2024, 2025]
+    assert table["Nye kunder"].tolist() == [1, 1]
+
+    with pytest.raises(ValueError):
+        find_new_customers(_report(), 2023, years)
+
+def test_new_customers_in_latest_year_by_default():
+    df_new, total_col = find_new_customers(_report())
+    assert total_col == "YTD 2025"
+    assert df_new["Name"].tolist() == ["Ny 2025"]
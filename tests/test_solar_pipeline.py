@@ -0,0 +1,36 @@
+# tests/test_solar_pipeline.py
+
+import pandas as pd
+
+from solar_pipeline import RouteStatKpis
+
+def _chunk(route_ids, days, planned, actual):
+    return pd.DataFrame(
+        {
+            "RouteId": route_ids,
+            "Date": pd.to_datetime(days),
+            "EstimateDuration (min)": planned,
+            "ActualDuration (min)": actual,
+        }
+    )
+
+def test_routes_are_counted_once_across_rows_and_chunks():
+    kpis = RouteStatKpis()
+    kpis.add(_chunk(["A", "A", "B"], ["2025-03-03", "2025-03-03", "2025-03-03"], [10, 20, 30], [15, 20, 30]))
+    kpis.add(_chunk(["A", "C"], ["2025-03-04", "2025-03-04"], [10, 40], [10, 50]))
+
+    totals = kpis.totals()
+    assert totals["Ruter"] == 3
+    assert totals["Planlagt (min)"] == 110
+
+    per_day = kpis.per_day().set_index("Dato")
+    assert per_day["Ruter"].to_dict() == {"2025-03-03": 2, "2025-03-04": 2}
+
+    per_route = kpis.per_route().set_index("RouteId")
+    assert "Ruter" not in per_route.columns
+    assert per_route.loc["A", "Realiseret (min)"] == 45
+
+def test_empty_file_has_zero_routes():
+    kpis = RouteStatKpis()
+    assert kpis.totals()["Ruter"] == 0
+    assert kpis.per_day().empty